@@ -3,10 +3,13 @@
 import os
 
 from flask import Flask
+from flask import g
 from flask import jsonify
+from flask import request
 from flask_cors import CORS
 
 from models import storage
+from models import storage_t
 from api.v1.views import app_views
 
 app = Flask(__name__)
@@ -15,6 +18,50 @@ app.register_blueprint(app_views)
 
 CORS(app, resources={r"/*": {"origins": "0.0.0.0"}})
 
+# A DBStorage generation only counts the writes of this process
+cache_enabled = os.getenv(
+        "HBNB_API_CACHE", default="0" if storage_t == "db" else "1") == "1"
+cache_size = int(os.getenv("HBNB_API_CACHE_SIZE", default="1024"))
+cached_headers = ["Content-Type", "ETag", "X-Next-Cursor"]
+# Views whose responses do not come from storage, and so could go stale
+# while its generation stays the same
+uncached_endpoints = {"app_views.status", "app_views.pool_stats"}
+# dictionary - request path -> (storage generation, body, headers)
+cache = {}
+
+
+@app.before_request
+def cached_response():
+    """Serve GET requests from the cache while storage is unchanged"""
+    g.generation = storage.generation()
+    if not cache_enabled or request.method != "GET" or \
+            request.endpoint in uncached_endpoints:
+        return None
+    entry = cache.get(request.full_path)
+    if entry is None or entry[0] != g.generation:
+        return None
+    g.cache_hit = True
+    response = app.response_class(entry[1], headers=entry[2])
+    return response.make_conditional(request)
+
+
+@app.after_request
+def cache_response(response):
+    """Add an ETag to JSON GET responses and remember their body"""
+    if request.method != "GET" or g.get("cache_hit") or \
+            response.status_code != 200 or response.is_streamed or \
+            not response.is_json:
+        return response
+    response.add_etag()
+    if cache_enabled and request.endpoint not in uncached_endpoints:
+        if len(cache) >= cache_size:
+            cache.pop(next(iter(cache)), None)
+        headers = [(name, response.headers[name]) for name in cached_headers
+                   if name in response.headers]
+        cache[request.full_path] = (g.generation, response.get_data(),
+                                    headers)
+    return response.make_conditional(request)
+
 
 @app.teardown_appcontext
 def close_storage(exceptions=None):
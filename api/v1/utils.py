@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+"""Helpers shared by the views of the Flask application"""
+import itertools
+import os
+
+from flask import abort
+from flask import current_app
+from flask import jsonify
+from flask import request
+from flask import stream_with_context
+
+from models.base_model import BaseModel
+from models.engine.cursor import decode_cursor
+from models.engine.cursor import encode_cursor
+
+# Collections at least this long are streamed instead of built in memory
+stream_min = int(os.getenv("HBNB_API_STREAM_MIN", default="1000"))
+# Number of objects serialized per chunk of a streamed response
+stream_chunk = 256
+
+
+def page_args():
+    """Returns the `limit` and `cursor` query parameters of the request"""
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            abort(400, description="Invalid limit")
+        if limit < 1:
+            abort(400, description="Invalid limit")
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            abort(400, description="Invalid cursor")
+    return limit, cursor
+
+
+def stream_json(objs, hidden=()):
+    """
+    Returns a response streaming the JSON array of the objects of the
+    `objs` iterable, serializing them a chunk at a time
+    """
+    dumps = current_app.json.dumps
+    objs = iter(objs)
+
+    def next_chunk():
+        """Returns the to_dict() dictionaries of the next chunk of objs"""
+        return BaseModel.to_dicts(itertools.islice(objs, stream_chunk),
+                                  hidden)
+
+    def generate():
+        """Yields the JSON array in chunks"""
+        separator = "["
+        dicts = next_chunk()
+        while dicts:
+            yield separator + ",".join(dumps(data) for data in dicts)
+            separator = ","
+            dicts = next_chunk()
+        yield "[]" if separator == "[" else "]"
+    return current_app.response_class(stream_with_context(generate()),
+                                      mimetype="application/json")
+
+
+def jsonify_page(objs, limit, hidden=()):
+    """
+    Serialize a page of objects without their `hidden` keys, adding the
+    cursor of the next page in the X-Next-Cursor header when the page is full
+
+    Collections of at least `stream_min` objects are streamed. Iterables
+    without a length are read up to `stream_min` objects to find out, so
+    that streaming them never holds more than that in memory.
+    """
+    if not hasattr(objs, "__len__"):
+        objs = iter(objs)
+        head = list(itertools.islice(objs, stream_min))
+        if len(head) < stream_min:
+            objs = head
+        else:
+            objs = itertools.chain(head, objs)
+    sized = hasattr(objs, "__len__")
+    if sized and len(objs) < stream_min:
+        response = jsonify(BaseModel.to_dicts(objs, hidden))
+    else:
+        response = stream_json(objs, hidden)
+    if limit is not None and sized and objs and len(objs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(objs[-1])
+    return response
@@ -4,6 +4,8 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models.amenity import Amenity
@@ -12,8 +14,8 @@ from models.amenity import Amenity
 @app_views.route("/amenities", methods=["GET"], strict_slashes=False)
 def all_amenities():
     """Handle GET requests to "/amenities" to retrieve all Amenity objects"""
-    amenities = storage.all(Amenity)
-    return jsonify([amenity.to_dict() for amenity in amenities.values()])
+    limit, cursor = page_args()
+    return jsonify_page(storage.page(Amenity, limit, cursor), limit)
 
 
 @app_views.route(
@@ -4,6 +4,8 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models.city import City
@@ -23,8 +25,9 @@ def all_state_cities(state_id):
     state = storage.get(State, state_id)
     if not state:
         abort(404)
-    cities = state.cities
-    return jsonify([city.to_dict() for city in cities])
+    limit, cursor = page_args()
+    cities = storage.page(City, limit, cursor, state_id=state_id)
+    return jsonify_page(cities, limit)
 
 
 @app_views.route("/cities/<city_id>", methods=["GET"], strict_slashes=False)
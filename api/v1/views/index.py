@@ -1,9 +1,11 @@
 #!/usr/bin/python3
 """Defines index route for Flask application"""
+from flask import abort
 from flask import jsonify
 
 from api.v1.views import app_views
 from models import storage
+from models import storage_t
 from models.amenity import Amenity
 from models.city import City
 from models.place import Place
@@ -21,13 +23,22 @@ def status():
 @app_views.route("/stats")
 def count():
     """Retrieves number of objects by type"""
+    counts = storage.counts()
     return jsonify(
             {
-                "amenities": storage.count(Amenity),
-                "cities": storage.count(City),
-                "places": storage.count(Place),
-                "reviews": storage.count(Review),
-                "states": storage.count(State),
-                "users": storage.count(User)
+                "amenities": counts[Amenity.__name__],
+                "cities": counts[City.__name__],
+                "places": counts[Place.__name__],
+                "reviews": counts[Review.__name__],
+                "states": counts[State.__name__],
+                "users": counts[User.__name__]
                 }
             )
+
+
+@app_views.route("/stats/pool")
+def pool_stats():
+    """Retrieves the state of the database connection pool"""
+    if storage_t != "db":
+        abort(404)
+    return jsonify(storage.pool_stats())
@@ -4,14 +4,14 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models import storage_t
 from models.place import Place
 from models.city import City
 from models.user import User
-from models.amenity import Amenity
-from models.state import State
 
 
 @app_views.route(
@@ -27,8 +27,9 @@ def all_city_places(city_id):
     city = storage.get(City, city_id)
     if not city:
         abort(404)
-    places = city.places
-    return jsonify([place.to_dict() for place in places])
+    limit, cursor = page_args()
+    places = storage.page(Place, limit, cursor, city_id=city_id)
+    return jsonify_page(places, limit)
 
 
 @app_views.route("/places/<place_id>", methods=["GET"], strict_slashes=False)
@@ -114,37 +115,7 @@ def places_search():
         abort(400, description="Not a JSON")
 
     data = request.get_json()
-    if data == {} or all(
-            isinstance(value, list) and not value
-            for value in data.values()):
-        places = list(storage.all(Place).values())
-        return jsonify([place.to_dict() for place in places])
-
-    s_cities = []
-    if data.get("states"):
-        states = [storage.get(State, state_id)
-                  for state_id in data["states"]
-                  if storage.get(State, state_id)]
-        s_cities = [city for state in states for city in state.cities]
-
-    cities = []
-    if data.get("cities"):
-        cities = [storage.get(City, city_id)
-                  for city_id in data["cities"]
-                  if storage.get(City, city_id)]
-
-    all_cities = set(s_cities + cities)
-    places = [place for city in all_cities for place in city.places]
-
-    if data.get("amenities"):
-        if not places:
-            places = storage.all(Place).values()
-        amenities = [storage.get(Amenity, amenity_id)
-                     for amenity_id in data.get("amenities")]
-        places = [place for place in places if all
-                  ([amenity in place.amenities for amenity in amenities])]
-
-    filtered_places = [{key: value for key, value in place.to_dict().items()
-                        if key != "amenities"} for place in places]
-
-    return jsonify(filtered_places)
+    limit, cursor = page_args()
+    places = storage.search_places(data.get("states"), data.get("cities"),
+                                   data.get("amenities"), limit, cursor)
+    return jsonify_page(places, limit, hidden=["amenities"])
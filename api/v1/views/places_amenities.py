@@ -23,18 +23,11 @@ def all_place_amenities(place_id):
     Handle GET requests to "/places/<place_id>/amenities"
     to retrieve all Amenity objects of a Place
     """
-    place = storage.get(Place, place_id)
+    place = storage.get(Place, place_id, load={"amenities": "joined"})
     if not place:
         abort(404)
 
-    if storage_t == "db":
-        amenities = place.amenities
-    else:
-        amenities = [
-                storage.get(Amenity, amenity_id)
-                for amenity_id in place.amenity_ids
-                ]
-    return jsonify([amenity.to_dict() for amenity in amenities if amenity])
+    return jsonify(Amenity.to_dicts(place.amenities))
 
 
 @app_views.route(
@@ -61,7 +54,9 @@ def delete_place_amenity(place_id, amenity_id):
     else:
         if amenity_id not in place.amenity_ids:
             abort(404)
-        place.amenity_ids.remove(amenity_id)
+        place.amenity_ids = [linked for linked in place.amenity_ids
+                             if linked != amenity_id]
+    storage.new(place)
     storage.save()
     return jsonify({}), 200
 
@@ -92,6 +87,7 @@ def link_amenity_place(place_id, amenity_id):
         if amenity_id in place.amenity_ids:
             return jsonify(amenity.to_dict()), 200
         else:
-            place.amenity_ids.append(amenity_id)
+            place.amenity_ids = place.amenity_ids + [amenity_id]
+    storage.new(place)
     storage.save()
     return jsonify(amenity.to_dict()), 201
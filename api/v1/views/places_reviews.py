@@ -4,6 +4,8 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models.review import Review
@@ -24,8 +26,9 @@ def all_place_reviews(place_id):
     place = storage.get(Place, place_id)
     if not place:
         abort(404)
-    reviews = place.reviews
-    return jsonify([review.to_dict() for review in reviews])
+    limit, cursor = page_args()
+    reviews = storage.page(Review, limit, cursor, place_id=place_id)
+    return jsonify_page(reviews, limit)
 
 
 @app_views.route(
@@ -4,6 +4,8 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models.state import State
@@ -14,8 +16,8 @@ def all_states():
     """
     Handle GET requests to "/states" to retrieve list of all State objects
     """
-    states = storage.all(State)
-    return jsonify([state.to_dict() for state in states.values()])
+    limit, cursor = page_args()
+    return jsonify_page(storage.page(State, limit, cursor), limit)
 
 
 @app_views.route("/states/<state_id>", methods=["GET"], strict_slashes=False)
@@ -4,6 +4,8 @@ from flask import abort
 from flask import jsonify
 from flask import request
 
+from api.v1.utils import jsonify_page
+from api.v1.utils import page_args
 from api.v1.views import app_views
 from models import storage
 from models.user import User
@@ -12,8 +14,8 @@ from models.user import User
 @app_views.route("/users", methods=["GET"], strict_slashes=False)
 def all_users():
     """Handle GET requests to "/users" to retrieve all User objects"""
-    users = storage.all(User)
-    return jsonify([user.to_dict() for user in users.values()])
+    limit, cursor = page_args()
+    return jsonify_page(storage.page(User, limit, cursor), limit)
 
 
 @app_views.route("/users/<user_id>", methods=["GET"], strict_slashes=False)
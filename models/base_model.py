@@ -7,7 +7,8 @@ from datetime import datetime
 import models
 from os import getenv
 import sqlalchemy
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy.orm import declared_attr
 from sqlalchemy.ext.declarative import declarative_base
 import uuid
 
@@ -19,6 +20,21 @@ else:
     Base = object
 
 
+def isoformat(value):
+    """Returns the datetime value formatted with time, the fast way"""
+    if value.microsecond:
+        return value.isoformat()
+    return value.strftime(time)
+
+
+def parse(value):
+    """Returns the datetime of the string value formatted with time"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, time)
+
+
 class BaseModel:
     """The BaseModel class from which future classes will be derived"""
     if models.storage_t == "db":
@@ -26,6 +42,12 @@ class BaseModel:
         created_at = Column(DateTime, default=datetime.utcnow)
         updated_at = Column(DateTime, default=datetime.utcnow)
 
+        @declared_attr
+        def __table_args__(cls):
+            """indexes (created_at, id), the keyset paging order"""
+            return (Index("ix_{}_created_at_id".format(cls.__tablename__),
+                          "created_at", "id"),)
+
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
         if kwargs:
@@ -33,11 +55,11 @@ class BaseModel:
                 if key != "__class__":
                     setattr(self, key, value)
             if kwargs.get("created_at", None) and type(self.created_at) is str:
-                self.created_at = datetime.strptime(kwargs["created_at"], time)
+                self.created_at = parse(kwargs["created_at"])
             else:
                 self.created_at = datetime.utcnow()
             if kwargs.get("updated_at", None) and type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(kwargs["updated_at"], time)
+                self.updated_at = parse(kwargs["updated_at"])
             else:
                 self.updated_at = datetime.utcnow()
             if kwargs.get("id", None) is None:
@@ -47,6 +69,30 @@ class BaseModel:
             self.created_at = datetime.utcnow()
             self.updated_at = self.created_at
 
+    if models.storage_t != "db":
+        def __setattr__(self, name, value):
+            """Sets an attribute and lets the storage re-index the object"""
+            super().__setattr__(name, value)
+            models.storage.touch(self, name)
+
+    @classmethod
+    def from_dict(cls, data):
+        """returns an instance rebuilt from a to_dict() dictionary, setting
+        its __dict__ at once instead of calling __init__ and __setattr__"""
+        obj = cls.__new__(cls)
+        attrs = data.copy()
+        attrs.pop("__class__", None)
+        for name in ("created_at", "updated_at"):
+            value = attrs.get(name)
+            if type(value) is str:
+                attrs[name] = parse(value)
+            elif value is None:
+                attrs[name] = datetime.utcnow()
+        if attrs.get("id") is None:
+            attrs["id"] = str(uuid.uuid4())
+        obj.__dict__.update(attrs)
+        return obj
+
     def __str__(self):
         """String representation of the BaseModel class"""
         return "[{:s}] ({:s}) {}".format(self.__class__.__name__, self.id,
@@ -61,17 +107,28 @@ class BaseModel:
     def to_dict(self):
         """returns a dictionary containing all keys/values of the instance"""
         new_dict = self.__dict__.copy()
-        if "created_at" in new_dict:
-            new_dict["created_at"] = new_dict["created_at"].strftime(time)
-        if "updated_at" in new_dict:
-            new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+        created_at = new_dict.get("created_at")
+        if type(created_at) is datetime:
+            new_dict["created_at"] = isoformat(created_at)
+        updated_at = new_dict.get("updated_at")
+        if type(updated_at) is datetime:
+            new_dict["updated_at"] = isoformat(updated_at)
         new_dict["__class__"] = self.__class__.__name__
-        if "_sa_instance_state" in new_dict:
-            del new_dict["_sa_instance_state"]
-        if "password" in new_dict and models.storage_t == "db":
-            del new_dict["password"]
+        new_dict.pop("_sa_instance_state", None)
+        if models.storage_t == "db":
+            new_dict.pop("password", None)
         return new_dict
 
+    @staticmethod
+    def to_dicts(objs, hidden=()):
+        """returns the list of the to_dict() dictionaries of objs, without
+        their hidden keys"""
+        dicts = [obj.to_dict() for obj in objs]
+        for name in hidden:
+            for new_dict in dicts:
+                new_dict.pop(name, None)
+        return dicts
+
     def delete(self):
         """delete the current instance from the storage"""
         models.storage.delete(self)
@@ -0,0 +1,24 @@
+#!/usr/bin/python3
+"""
+Contains the keyset cursor helpers shared by the storage engines
+"""
+
+import base64
+from datetime import datetime
+from models.base_model import time
+
+
+def encode_cursor(obj):
+    """Returns the opaque cursor pointing right after obj"""
+    raw = obj.created_at.strftime(time) + "|" + obj.id
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns the (created_at, id) pair encoded in cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, id = raw.split("|", 1)
+        return datetime.strptime(created_at, time), id
+    except (TypeError, ValueError):
+        raise ValueError("invalid cursor: {}".format(cursor))
@@ -7,23 +7,187 @@ import models
 from models.amenity import Amenity
 from models.base_model import BaseModel, Base
 from models.city import City
+from models.engine.cursor import decode_cursor
 from models.place import Place
 from models.review import Review
 from models.state import State
 from models.user import User
 from os import getenv
 import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import and_, create_engine, event, func, literal, or_
+from sqlalchemy import select, union_all
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DatabaseError, TimeoutError
+from sqlalchemy.orm import joinedload, scoped_session, selectinload
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.pool import QueuePool, StaticPool
+import threading
 
 classes = {"Amenity": Amenity, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
+# create_engine() pool arguments and the variables that configure them
+pool_settings = {"pool_size": ("HBNB_MYSQL_POOL_SIZE", int),
+                 "max_overflow": ("HBNB_MYSQL_MAX_OVERFLOW", int),
+                 "pool_recycle": ("HBNB_MYSQL_POOL_RECYCLE", int),
+                 "pool_timeout": ("HBNB_MYSQL_POOL_TIMEOUT", float),
+                 "pool_pre_ping": ("HBNB_MYSQL_POOL_PRE_PING",
+                                   lambda v: v.lower() in ("1", "true"))}
+
+# loader option of each eager loading strategy accepted by load=
+loaders = {"selectin": selectinload, "joined": joinedload}
+
+# PRAGMA statements run on every new SQLite connection
+sqlite_pragmas = ("journal_mode=WAL", "synchronous=NORMAL",
+                  "foreign_keys=ON", "busy_timeout=5000",
+                  "cache_size=-65536", "temp_store=MEMORY")
+
+
+def load_options(cls, load, stream=False):
+    """Returns the loader options eager loading the relationship paths of
+    load, like "cities" or "cities.places" from State: either a list loaded
+    with SELECT ... IN queries, or a dictionary mapping each path to the
+    "selectin" or "joined" strategy. When the rows are streamed, joined
+    collections are loaded with selectin instead, as yield_per cannot
+    merge the rows a JOIN repeats for each item of a collection"""
+    if not isinstance(load, dict):
+        load = dict.fromkeys(load, "selectin")
+    options = []
+    for path, wanted in load.items():
+        option = None
+        parent = cls
+        for name in path.split("."):
+            attr = getattr(parent, name)
+            strategy = wanted
+            if stream and strategy == "joined" and attr.property.uselist:
+                strategy = "selectin"
+            if option is None:
+                option = loaders[strategy](attr)
+            else:
+                option = getattr(option, strategy + "load")(attr)
+            parent = attr.property.mapper.class_
+        options.append(option)
+    return options
+
+
+def index_names(engine, table):
+    """Returns the names of the indexes the database has on table"""
+    return {index["name"] for index in
+            sqlalchemy.inspect(engine).get_indexes(table.name)}
+
+
+def create_indexes(engine):
+    """Creates the indexes of the models that existing tables lack, as
+    create_all() only creates them along with their table, and returns
+    their names. An index another process creates meanwhile is skipped"""
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing = index_names(engine, table)
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            try:
+                index.create(engine)
+            except DatabaseError:
+                if index.name not in index_names(engine, table):
+                    raise
+                continue
+            created.append(index.name)
+    return created
+
+
+class PoolCounters:
+    """Counts the connections a pool opens, checks out and checks in,
+    through the pool events, and the checkouts that waited or timed out.
+    Every count is updated under a lock"""
+
+    def __init__(self):
+        """Instantiate PoolCounters at zero"""
+        self.__lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.waits = 0
+        self.timeouts = 0
+
+    def add(self, name):
+        """Adds one to the count name"""
+        with self.__lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def in_use(self):
+        """Returns the number of connections checked out"""
+        with self.__lock:
+            return self.checkouts - self.checkins
+
+    def listen(self, pool):
+        """Counts the connect, checkout and checkin events of pool"""
+        event.listen(pool, "connect", self.__connect)
+        event.listen(pool, "checkout", self.__checkout)
+        event.listen(pool, "checkin", self.__checkin)
+
+    def __connect(self, dbapi_connection, connection_record):
+        """Counts a new connection"""
+        self.add("connects")
+
+    def __checkout(self, dbapi_connection, connection_record, proxy):
+        """Counts a checkout"""
+        self.add("checkouts")
+
+    def __checkin(self, dbapi_connection, connection_record):
+        """Counts a checkin"""
+        self.add("checkins")
+
+
+class CountingQueuePool(QueuePool):
+    """QueuePool keeping PoolCounters. waits is approximate: it counts the
+    checkouts that began while every connection the pool may open was in
+    use, though another thread may free one before they actually wait"""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kwargs):
+        """Instantiate a CountingQueuePool"""
+        super().__init__(creator, pool_size=pool_size,
+                         max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.counters = PoolCounters()
+        if "_dispatch" not in kwargs:
+            self.counters.listen(self)
+
+    def recreate(self):
+        """Returns a new pool like this one, which inherits its event
+        listeners and so goes on with its counters"""
+        pool = super().recreate()
+        pool.counters = self.counters
+        return pool
+
+    def connect(self):
+        """Checks out a connection, counting waits and timeouts"""
+        if self.max_overflow > -1 and \
+                self.counters.in_use() >= self.size() + self.max_overflow:
+            self.counters.add("waits")
+        try:
+            return super().connect()
+        except TimeoutError:
+            self.counters.add("timeouts")
+            raise
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tunes a new SQLite connection with sqlite_pragmas"""
+    cursor = dbapi_connection.cursor()
+    for pragma in sqlite_pragmas:
+        cursor.execute("PRAGMA " + pragma)
+    cursor.close()
+
 
 class DBStorage:
     """interaacts with the MySQL database"""
     __engine = None
     __session = None
+    __generation = 0
+    # integer - rows fetched at a time by iterate()
+    __batch = int(getenv('HBNB_DB_BATCH', 1000))
 
     def __init__(self):
         """Instantiate a DBStorage object"""
@@ -32,37 +196,79 @@ class DBStorage:
         HBNB_MYSQL_HOST = getenv('HBNB_MYSQL_HOST')
         HBNB_MYSQL_DB = getenv('HBNB_MYSQL_DB')
         HBNB_ENV = getenv('HBNB_ENV')
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.
-                                      format(HBNB_MYSQL_USER,
-                                             HBNB_MYSQL_PWD,
-                                             HBNB_MYSQL_HOST,
-                                             HBNB_MYSQL_DB))
+        url = getenv('HBNB_DB_URL')
+        if url is None:
+            url = 'mysql+mysqldb://{}:{}@{}/{}'.format(HBNB_MYSQL_USER,
+                                                       HBNB_MYSQL_PWD,
+                                                       HBNB_MYSQL_HOST,
+                                                       HBNB_MYSQL_DB)
+        url = make_url(url)
+        options = {"poolclass": CountingQueuePool}
+        for arg, (var, cast) in pool_settings.items():
+            if getenv(var) is not None:
+                options[arg] = cast(getenv(var))
+        if url.get_backend_name() == "sqlite":
+            options["connect_args"] = {"check_same_thread": False}
+            if url.database in (None, "", ":memory:"):
+                # a single connection, or each thread gets its own database
+                options = {"poolclass": StaticPool,
+                           "connect_args": options["connect_args"]}
+        self.__engine = create_engine(url, **options)
+        if url.get_backend_name() == "sqlite":
+            event.listen(self.__engine, "connect", set_sqlite_pragmas)
         if HBNB_ENV == "test":
             Base.metadata.drop_all(self.__engine)
 
-    def all(self, cls=None):
-        """query on the current database session"""
+    def all(self, cls=None, load=(), order_by=None):
+        """query on the current database session, eager loading the
+        relationships of load (see load_options) and ordering by the
+        column order_by if given"""
         new_dict = {}
-        for clss in classes:
-            if cls is None or cls is classes[clss] or cls is clss:
-                objs = self.__session.query(classes[clss]).all()
-                for obj in objs:
-                    key = obj.__class__.__name__ + '.' + obj.id
-                    new_dict[key] = obj
+        for clss in self.__classes(cls):
+            query = self.__select(clss, load, order_by)
+            for obj in self.__session.scalars(query).unique().all():
+                new_dict[obj.__class__.__name__ + '.' + obj.id] = obj
         return (new_dict)
 
+    def iterate(self, cls=None, load=(), order_by=None):
+        """Yields the objects of cls (of all classes if None) one at a time,
+        fetching __batch rows at once through a server-side cursor, eager
+        loading the relationships of load (see load_options) and ordering
+        by the column order_by of the classes that have it"""
+        for clss in self.__classes(cls):
+            query = self.__select(clss, load, order_by, True)
+            query = query.execution_options(yield_per=self.__batch)
+            for obj in self.__session.scalars(query):
+                yield obj
+
+    def __classes(self, cls):
+        """Returns the mapped classes matching cls, a class or its name, or
+        all of them if cls is None"""
+        return [clss for name, clss in classes.items()
+                if cls is None or cls is clss or cls == name]
+
+    def __select(self, cls, load, order_by, stream=False):
+        """Returns the query of the cls objects for all() and iterate()"""
+        query = select(cls).options(*load_options(cls, load, stream))
+        if order_by is not None and hasattr(cls, order_by):
+            query = query.order_by(getattr(cls, order_by))
+        return query
+
     def new(self, obj):
         """add the object to the current database session"""
         self.__session.add(obj)
+        self.__generation += 1
 
     def save(self):
         """commit all changes of the current database session"""
         self.__session.commit()
+        self.__generation += 1
 
     def delete(self, obj=None):
         """delete from the current database session obj if not None"""
         if obj is not None:
             self.__session.delete(obj)
+            self.__generation += 1
 
     def reload(self):
         """reloads data from the database"""
@@ -71,16 +277,122 @@ class DBStorage:
         Session = scoped_session(sess_factory)
         self.__session = Session
 
+    def migrate(self):
+        """Creates the indexes the existing tables lack, and returns their
+        names (see models/engine/migrate.py)"""
+        return create_indexes(self.__engine)
+
     def close(self):
         """call remove() method on the private session attribute"""
         self.__session.remove()
 
-    def get(self, cls, id):
-        """Retrieve one object based on class and id"""
+    def pool_stats(self):
+        """Returns the state of the connection pool of the engine"""
+        pool = self.__engine.pool
+        if not isinstance(pool, CountingQueuePool):
+            return {"pool": type(pool).__name__}
+        counters = pool.counters
+        return {"size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "connects": counters.connects,
+                "checkouts": counters.checkouts,
+                "waits": counters.waits,
+                "timeouts": counters.timeouts}
+
+    def generation(self):
+        """Returns a number that changes whenever this process writes"""
+        return self.__generation
+
+    def get(self, cls, id, load=()):
+        """Retrieve one object based on class and id, eager loading the
+        relationships of load (see load_options) if it is not in the
+        session yet"""
         if cls is None or id is None:
             return None
-        return self.__session.query(cls).filter_by(id=id).first()
+        if isinstance(cls, str):
+            cls = classes.get(cls)
+        if cls not in classes.values():
+            return None
+        return self.__session.get(cls, id, options=load_options(cls, load))
+
+    def get_many(self, cls, ids, load=()):
+        """Retrieve the cls objects of the given ids, in the same order and
+        leaving out the missing ones, querying those not in the session
+        with IN queries of __batch ids at most that eager load the
+        relationships of load (see load_options)"""
+        if isinstance(cls, str):
+            cls = classes[cls]
+        session = self.__session
+        found = {}
+        missing = []
+        for id in dict.fromkeys(ids):
+            obj = session.identity_map.get(identity_key(cls, id))
+            if obj is not None:
+                found[id] = obj
+            else:
+                missing.append(id)
+        for i in range(0, len(missing), self.__batch):
+            query = select(cls).options(*load_options(cls, load)).where(
+                cls.id.in_(missing[i:i + self.__batch]))
+            for obj in session.scalars(query).unique():
+                found[obj.id] = obj
+        return [found[id] for id in ids if id in found]
 
     def count(self, cls=None):
         """Count number of objects in storage"""
-        return len(self.all(cls))
+        if cls is None:
+            return sum(self.counts().values())
+        if isinstance(cls, str):
+            cls = classes[cls]
+        return self.__session.query(func.count()).select_from(cls).scalar()
+
+    def counts(self):
+        """Returns the number of objects of each class, in a single query"""
+        query = union_all(*[select(literal(name), func.count()).select_from(
+            classes[name]) for name in classes])
+        return {name: count for name, count in self.__session.execute(query)}
+
+    def search_places(self, states=None, cities=None, amenities=None,
+                      limit=None, cursor=None):
+        """Returns the places located in any of the states or cities given
+        (all places if there are none) that have all the amenities given,
+        streamed from the database unless paginating"""
+        from models.place import place_amenity
+        query = self.__session.query(Place)
+        if states or cities:
+            state_cities = select(City.id).where(
+                City.state_id.in_(states or []))
+            query = query.filter(or_(Place.city_id.in_(cities or []),
+                                     Place.city_id.in_(state_cities)))
+        if amenities:
+            wanted = set(amenities)
+            linked = select(place_amenity.c.place_id).where(
+                place_amenity.c.amenity_id.in_(wanted)).group_by(
+                place_amenity.c.place_id).having(
+                func.count(place_amenity.c.amenity_id) == len(wanted))
+            query = query.filter(Place.id.in_(linked))
+        return self.__paginate(query, Place, limit, cursor)
+
+    def page(self, cls, limit=None, cursor=None, **filters):
+        """Returns the cls objects whose attributes match filters, ordered
+        by (created_at, id) and starting after cursor when paginating,
+        streamed from the database otherwise"""
+        query = self.__session.query(cls).filter_by(**filters)
+        return self.__paginate(query, cls, limit, cursor)
+
+    def __paginate(self, query, cls, limit, cursor):
+        """Returns at most limit rows of query that sort after cursor, or an
+        iterator streaming all its rows if neither is given"""
+        if limit is None and cursor is None:
+            return iter(query.yield_per(self.__batch))
+        if cursor is not None:
+            created_at, id = decode_cursor(cursor)
+            query = query.filter(or_(cls.created_at > created_at,
+                                     and_(cls.created_at == created_at,
+                                          cls.id > id)))
+        query = query.order_by(cls.created_at, cls.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
@@ -3,10 +3,21 @@
 Contains the FileStorage classs
 """
 
+import atexit
+from datetime import datetime
+import fcntl
+import heapq
 import json
+import marshal
+import os
+import threading
 from models.amenity import Amenity
-from models.base_model import BaseModel
+from models.base_model import BaseModel, isoformat
 from models.city import City
+from models.engine.cursor import decode_cursor
+from models.engine.lazy_objects import LazyObjects
+from models.engine.snapshot import binary_positions, encode_json, \
+    json_positions, read_binary, write_binary, write_json
 from models.place import Place
 from models.review import Review
 from models.state import State
@@ -19,61 +30,592 @@ classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
 class FileStorage:
     """Serializes instances to a JSON file & deserializes back to instances"""
 
-    # string - path to the JSON file
-    __file_path = "file.json"
-    # dictionary - empty but will store all objects by <class name>.id
-    __objects = {}
-
-    def all(self, cls=None):
-        """Returns the dictionary __objects"""
-        if cls is not None:
-            new_dict = {}
-            for key, value in self.__objects.items():
-                if cls == value.__class__ or cls == value.__class__.__name__:
-                    new_dict[key] = value
-            return new_dict
-        return self.__objects
+    # boolean - keep the objects in a binary snapshot instead of JSON
+    __binary = os.getenv("HBNB_FILE_FORMAT") == "binary"
+    # string - path to the JSON file (or binary snapshot)
+    __file_path = "file.bin" if __binary else "file.json"
+    # boolean - reload() only indexes where each object is in the file
+    __lazy = os.getenv("HBNB_FILE_LAZY") == "1"
+    # dictionary - empty but will store all objects by <class name>.id,
+    # kept as compact records (HBNB_FILE_COMPACT=1) or file positions
+    # (HBNB_FILE_LAZY=1) until looked up
+    if os.getenv("HBNB_FILE_COMPACT") == "1" or __lazy:
+        __objects = LazyObjects(classes)
+    else:
+        __objects = {}
+    # tuple - generation, (inode, size, mtime) of __file_path and of its
+    # journal when last read or written
+    __file_stamp = None
+    # boolean - append changes to __file_path.log instead of rewriting
+    __journal = os.getenv("HBNB_FILE_JOURNAL") == "1"
+    # integer - journal size in bytes past which it is folded into the file
+    __journal_max = int(os.getenv("HBNB_FILE_JOURNAL_MAX", 1024 * 1024))
+    # dictionary - objects (or None once deleted) not yet written, by key
+    __pending = {}
+    # float - seconds between the writes of a background flusher thread,
+    # save() writes at once when 0
+    __flush_interval = float(os.getenv("HBNB_FILE_FLUSH_INTERVAL", 0))
+    # integer - pending changes past which save() writes at once anyway
+    __flush_max = int(os.getenv("HBNB_FILE_FLUSH_MAX", 1000))
+    # boolean - save() was called since the last write
+    __deferred = False
+    # thread - background flusher, started by the first deferred save()
+    __flusher = None
+    # Event - set to have the flusher thread return
+    __stopping = threading.Event()
+    # boolean - stop() is registered to run at exit
+    __at_exit = False
+    # dictionary - <class name> -> keys of its objects (ordered, values None)
+    __classes = {}
+    # dictionary - <class name> -> {attr: ({key: value}, {value: keys})}
+    __links = {}
+    # set - attribute names that have a foreign key index in __links
+    __linked = set()
+    # dictionary - the __objects that __classes was built from
+    __indexed = None
+    # integer - bumped every time the stored objects change
+    __generation = 0
+    # dictionary - key -> encoded to_dict() of the object last written,
+    # None while it is being encoded
+    __encoded = {}
+    # set - keys of __encoded whose object changed since it was encoded
+    __dirty = set()
+    # lock - held by the threads changing the objects or their indexes,
+    # while the threads reading them go through snapshots of the indexes
+    __mutex = threading.RLock()
+
+    def all(self, cls=None, load=(), order_by=None):
+        """Returns the dictionary __objects, or its cls objects, ordered by
+        their attribute order_by if given (load, the relationships that
+        DBStorage eager loads, is ignored)"""
+        if cls is None and order_by is None:
+            return self.__objects
+        objects = self.__objects
+        found = {}
+        for key in self.__keys(cls, order_by):
+            obj = objects.get(key)
+            if obj is not None:
+                found[key] = obj
+        return found
+
+    def iterate(self, cls=None, load=(), order_by=None):
+        """Yields the objects of cls (of all classes if None) one at a time,
+        ordered by their attribute order_by if given, without keeping the
+        ones that were not instantiated yet (load is ignored)"""
+        objects = self.__objects
+        for key in self.__keys(cls, order_by):
+            if isinstance(objects, LazyObjects):
+                obj = objects.peek(key)
+            else:
+                obj = objects.get(key)
+            if obj is not None:
+                yield obj
+
+    def __keys(self, cls, order_by):
+        """Returns the keys of the cls objects (of all objects if None),
+        sorted by class and attribute order_by if it is not None"""
+        if cls is None:
+            keys = list(self.__objects)
+        else:
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            keys = list(self.__buckets().get(cls, ()))
+        if order_by is not None:
+            def order(key):
+                """Returns the sort key of the object at key, nulls first
+                and dates compared as the text of to_dict()"""
+                try:
+                    value = self.__value(self.__source(key), order_by)
+                except KeyError:
+                    value = None
+                if type(value) is datetime:
+                    value = isoformat(value)
+                return (key.split(".", 1)[0], value is not None, value)
+            keys.sort(key=order)
+        return keys
 
     def new(self, obj):
         """Sets in __objects the obj with key <obj class name>.id"""
         if obj is not None:
             key = obj.__class__.__name__ + "." + obj.id
-            self.__objects[key] = obj
+            with self.__mutex:
+                self.__put(key, obj)
+                self.__pending[key] = obj
+                self.__encoded.pop(key, None)
+
+    def __put(self, key, obj):
+        """Stores obj in __objects and in its class bucket"""
+        buckets = self.__buckets()
+        FileStorage.__generation += 1
+        self.__objects[key] = obj
+        buckets.setdefault(key.split(".", 1)[0], {})[key] = None
+        self.__link(key, obj)
+
+    def __drop(self, key):
+        """Removes key from __objects and from its class bucket"""
+        buckets = self.__buckets()
+        FileStorage.__generation += 1
+        if key in self.__objects:
+            del self.__objects[key]
+            buckets[key.split(".", 1)[0]].pop(key, None)
+            self.__unlink(key)
+
+    def __buckets(self):
+        """Returns the class buckets, rebuilt if __objects was replaced"""
+        if FileStorage.__indexed is not self.__objects:
+            with self.__mutex:
+                objects = self.__objects
+                if FileStorage.__indexed is not objects:
+                    buckets = {}
+                    for key in objects:
+                        name = key.split(".", 1)[0]
+                        buckets.setdefault(name, {})[key] = None
+                    FileStorage.__classes = buckets
+                    FileStorage.__links = {}
+                    FileStorage.__linked = set()
+                    FileStorage.__encoded = {}
+                    FileStorage.__dirty = set()
+                    FileStorage.__indexed = objects
+        return FileStorage.__classes
+
+    def __link(self, key, obj, attrs=None):
+        """Moves key to the right entry of its foreign key indexes"""
+        links = self.__links.get(key.split(".", 1)[0], {})
+        for attr in (links if attrs is None else attrs):
+            if attr not in links:
+                continue
+            by_key, by_value = links[attr]
+            value = self.__value(obj, attr)
+            if key in by_key:
+                if by_key[key] == value:
+                    continue
+                self.__unlink(key, [attr])
+            by_key[key] = value
+            by_value.setdefault(value, {})[key] = None
+
+    def __unlink(self, key, attrs=None):
+        """Removes key from its foreign key indexes"""
+        links = self.__links.get(key.split(".", 1)[0], {})
+        for attr in (links if attrs is None else attrs):
+            by_key, by_value = links[attr]
+            if key in by_key:
+                value = by_key.pop(key)
+                del by_value[value][key]
+                if not by_value[value]:
+                    del by_value[value]
+
+    def related(self, cls, attr, value):
+        """Returns the list of cls objects whose attribute attr is value"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        bucket = self.__buckets().get(cls, {})
+        links = self.__links.get(cls, {})
+        if attr not in links:
+            with self.__mutex:
+                links = self.__links.setdefault(cls, {})
+                if attr not in links:
+                    FileStorage.__linked.add(attr)
+                    by_key, by_value = {}, {}
+                    for key in bucket:
+                        linked = self.__value(self.__source(key), attr)
+                        by_key[key] = linked
+                        by_value.setdefault(linked, {})[key] = None
+                    links[attr] = (by_key, by_value)
+        objects = self.__objects
+        found = [objects.get(key)
+                 for key in list(links[attr][1].get(value, ()))]
+        return [obj for obj in found if obj is not None]
+
+    def __value(self, obj, attr):
+        """Returns the attribute attr of obj, an object or its to_dict()
+        dictionary"""
+        if type(obj) is dict:
+            return obj.get(attr)
+        return getattr(obj, attr, None)
+
+    def __source(self, key):
+        """Returns the object at key, or its to_dict() dictionary if it is
+        not instantiated"""
+        if isinstance(self.__objects, LazyObjects):
+            obj = self.__objects.loaded(key)
+            return obj if obj is not None else self.__objects.to_dict(key)
+        return self.__objects[key]
+
+    def search_places(self, states=None, cities=None, amenities=None,
+                      limit=None, cursor=None):
+        """Returns the places located in any of the states or cities given
+        (all places if there are none) that have all the amenities given,
+        going through the places one at a time if there are no states or
+        cities"""
+        city_ids = dict.fromkeys(cities or ())
+        for state_id in states or ():
+            for city in self.related(City, "state_id", state_id):
+                city_ids[city.id] = None
+        if states or cities:
+            places = [place for city_id in city_ids
+                      for place in self.related(Place, "city_id", city_id)]
+        else:
+            places = self.iterate(Place)
+        if amenities:
+            wanted = set(amenities)
+            places = (place for place in places
+                      if wanted.issubset(place.amenity_ids))
+        return self.__paginate(places, limit, cursor)
+
+    def page(self, cls, limit=None, cursor=None, **filters):
+        """Returns the cls objects whose attributes match filters, ordered
+        by (created_at, id) and starting after cursor when paginating, and
+        all of them one at a time if there are no filters either"""
+        if filters:
+            attr, value = next(iter(filters.items()))
+            objs = [obj for obj in self.related(cls, attr, value)
+                    if all(getattr(obj, k, None) == v
+                           for k, v in filters.items())]
+        else:
+            objs = self.iterate(cls)
+        return self.__paginate(objs, limit, cursor)
+
+    def __paginate(self, objs, limit, cursor):
+        """Returns at most limit of objs that sort after cursor, going
+        through objs once without holding more than the page"""
+        if limit is None and cursor is None:
+            return objs
+
+        def order(obj):
+            """Returns the keyset sort key of obj"""
+            return (obj.created_at, obj.id)
+        if cursor is not None:
+            after = decode_cursor(cursor)
+            objs = (obj for obj in objs if order(obj) > after)
+        if limit is None:
+            return sorted(objs, key=order)
+        return heapq.nsmallest(limit, objs, key=order)
+
+    def touch(self, obj, attr):
+        """Re-indexes obj after its attribute attr has been set and marks
+        its last encoding as outdated"""
+        key = obj.__class__.__name__ + "." + str(getattr(obj, "id", ""))
+        if key in self.__encoded:
+            self.__dirty.add(key)
+        if attr in self.__linked:
+            if isinstance(self.__objects, LazyObjects):
+                live = self.__objects.loaded(key)
+            else:
+                live = self.__objects.get(key)
+            if live is obj:
+                with self.__mutex:
+                    self.__link(key, obj, [attr])
 
     def save(self):
-        """serializes __objects to the JSON file (path: __file_path)"""
-        json_objects = {}
-        for key in self.__objects:
-            json_objects[key] = self.__objects[key].to_dict()
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        """serializes __objects to the JSON file (path: __file_path) while
+        holding the writer lock, after merging the changes written by other
+        processes since the last read, or leave it to a background thread
+        when HBNB_FILE_FLUSH_INTERVAL is set"""
+        with self.__mutex:
+            if self.__flush_interval > 0 and \
+                    len(self.__pending) < self.__flush_max:
+                FileStorage.__deferred = True
+                self.__start_flusher()
+            else:
+                self.__save()
+
+    def flush(self):
+        """writes the changes left by save() to the JSON file and syncs it
+        to disk, which is done at exit too"""
+        with self.__mutex:
+            if self.__deferred or self.__pending:
+                self.__save(durable=True)
+
+    def stop(self):
+        """stops the flusher thread and writes the changes it left, which
+        is done at exit too"""
+        FileStorage.__stopping.set()
+        flusher = FileStorage.__flusher
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join()
+        FileStorage.__flusher = None
+        self.flush()
+
+    def __start_flusher(self):
+        """Starts the thread calling flush() every __flush_interval"""
+        if not FileStorage.__at_exit:
+            atexit.register(self.stop)
+            FileStorage.__at_exit = True
+        flusher = FileStorage.__flusher
+        if flusher is None or not flusher.is_alive():
+            FileStorage.__stopping.clear()
+            flusher = threading.Thread(target=self.__flush_loop, daemon=True)
+            FileStorage.__flusher = flusher
+            flusher.start()
+
+    def __flush_loop(self):
+        """Calls flush() every __flush_interval until it is set to 0 or
+        stop() is called"""
+        while self.__flush_interval > 0 and \
+                not self.__stopping.wait(self.__flush_interval):
+            self.flush()
+
+    def __save(self, durable=False):
+        """does save() once the current thread holds __mutex, and syncs the
+        files written to disk if durable. Raises without writing anything
+        if the file was changed by another writer and cannot be read"""
+        lock = self.__lock()
+        try:
+            if self.__stamp() != self.__file_stamp:
+                self.__sync()
+            if self.__journal:
+                self.__append(durable)
+                if self.__journal_size() > self.__journal_max:
+                    self.__write(durable)
+                    open(self.__file_path + ".log", 'w').close()
+            else:
+                self.__write(durable)
+            self.__pending.clear()
+            FileStorage.__deferred = False
+            self.__bump(lock)
+            FileStorage.__file_stamp = self.__stamp()
+        finally:
+            os.close(lock)
+
+    def __lock(self):
+        """Returns a descriptor of the lock file once this process holds the
+        writer lock, which is released by closing it"""
+        fd = os.open(self.__file_path + ".lock", os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            os.close(fd)
+            raise
+        return fd
+
+    def __bump(self, lock):
+        """Increments the generation number kept in the lock file"""
+        try:
+            generation = int(os.pread(lock, 32, 0)) + 1
+        except ValueError:
+            generation = 1
+        os.pwrite(lock, b"%20d\n" % generation, 0)
+
+    def __sync(self):
+        """replaces __objects with the content of the JSON file and of its
+        journal, keeping the changes not written yet, or leaves __objects
+        and __file_stamp as they are if the file cannot be read"""
+        if isinstance(self.__objects, LazyObjects):
+            objects = LazyObjects(classes)
+        else:
+            objects = {}
+        self.__load(objects)
+        for key, obj in self.__pending.items():
+            if obj is None:
+                if key in objects:
+                    del objects[key]
+            else:
+                objects[key] = obj
+        FileStorage.__objects = objects
+        self.__buckets()
+
+    def __write(self, durable=False):
+        """writes __objects to a new snapshot, one object per line of JSON
+        or one marshal record each, and renames it over the old one"""
+        objects = self.__objects
+        if self.__binary:
+            dumps, write = marshal.dumps, write_binary
+        else:
+            dumps, write = encode_json, write_json
+        if isinstance(objects, LazyObjects):
+            records = ((key, objects.raw(key, dumps)) for key in objects)
+        else:
+            records = ((key, self.__encode(key, objects[key], dumps))
+                       for key in objects)
+        tmp_path = self.__file_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            positions = write(f, records)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        if self.__lazy and isinstance(objects, LazyObjects):
+            objects.rebase(os.open(tmp_path, os.O_RDONLY), positions)
+        os.replace(tmp_path, self.__file_path)
+
+    def __encode(self, key, obj, dumps):
+        """Returns dumps() of the to_dict() of obj, cached until touch()
+        reports a change"""
+        value = self.__encoded.get(key)
+        if value is None or key in self.__dirty:
+            self.__encoded[key] = None
+            self.__dirty.discard(key)
+            value = dumps(obj.to_dict())
+            self.__encoded[key] = value
+        return value
 
     def reload(self):
-        """deserializes the JSON file to __objects"""
+        """deserializes the JSON file and its journal to __objects, raising
+        if the file exists but cannot be read"""
+        with self.__mutex:
+            self.__load(self.__objects)
+            FileStorage.__indexed = None
+            self.__buckets()
+
+    def __load(self, objects):
+        """stores the objects of the JSON file and of its journal in
+        objects, leaving the indexes to be rebuilt. A missing file holds no
+        objects, while any other error is raised before __file_stamp is
+        updated, so that save() does not overwrite what it could not read"""
+        stamp = self.__stamp()
+        try:
+            lazy = isinstance(objects, LazyObjects) and self.__lazy
+            if not (lazy and self.__index(objects)):
+                with open(self.__file_path, 'rb') as f:
+                    if self.__binary:
+                        jo = read_binary(f)
+                    else:
+                        jo = json.load(f)
+                self.__put_all(objects, jo)
+        except FileNotFoundError:
+            pass
+        if self.__journal:
+            self.__replay(objects)
+        FileStorage.__file_stamp = stamp
+        FileStorage.__generation += 1
+
+    def __index(self, objects):
+        """Records in objects where each object of the snapshot is instead
+        of loading it, and returns False if the file layout does not allow
+        it"""
+        fd = os.open(self.__file_path, os.O_RDONLY)
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key in jo:
-                self.__objects[key] = classes[jo[key]["__class__"]](**jo[key])
+            with os.fdopen(os.dup(fd), 'rb') as f:
+                if self.__binary:
+                    positions, loads = binary_positions(f), marshal.loads
+                else:
+                    positions, loads = json_positions(f), json.loads
         except Exception:
+            os.close(fd)
+            raise
+        if positions is None:
+            os.close(fd)
+            return False
+        objects.index(fd, positions, loads)
+        return True
+
+    def __put_all(self, objects, jo):
+        """Stores all the to_dict() dictionaries of jo in objects"""
+        if isinstance(objects, LazyObjects):
+            for key, data in jo.items():
+                objects.load(key, data)
+        else:
+            for key, data in jo.items():
+                objects[key] = classes[data["__class__"]].from_dict(data)
+
+    def __append(self, durable=False):
+        """appends one journal record per pending change to the log"""
+        lines = []
+        for key, obj in self.__pending.items():
+            value = obj.to_dict() if obj is not None else None
+            lines.append(json.dumps({"key": key, "value": value}) + "\n")
+        self.__pending.clear()
+        if lines:
+            with open(self.__file_path + ".log", 'a') as f:
+                f.write("".join(lines))
+                if durable:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+    def __replay(self, objects):
+        """applies the journal records found in the log to objects"""
+        try:
+            with open(self.__file_path + ".log", 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    key, value = record["key"], record["value"]
+                    if value is None:
+                        if key in objects:
+                            del objects[key]
+                    else:
+                        self.__put_all(objects, {key: value})
+        except FileNotFoundError:
             pass
 
+    def __journal_size(self):
+        """Returns the size in bytes of the journal"""
+        try:
+            return os.path.getsize(self.__file_path + ".log")
+        except OSError:
+            return 0
+
     def delete(self, obj=None):
         """delete obj from __objects if it’s inside"""
         if obj is not None:
             key = obj.__class__.__name__ + '.' + obj.id
-            if key in self.__objects:
-                del self.__objects[key]
+            with self.__mutex:
+                if key in self.__objects:
+                    self.__drop(key)
+                    self.__pending[key] = None
+                    self.__encoded.pop(key, None)
+                    self.__dirty.discard(key)
 
     def close(self):
-        """call reload() method for deserializing the JSON file to objects"""
-        self.reload()
+        """reload the JSON file if it was changed by another writer and
+        turn the objects instantiated since the last call back into records,
+        stopping the flusher thread once write-behind is turned off"""
+        if self.__flush_interval <= 0 and self.__flusher is not None:
+            self.stop()
+        with self.__mutex:
+            if self.__stamp() != self.__file_stamp:
+                try:
+                    self.__sync()
+                except Exception:
+                    # keep serving the objects last read: the next close()
+                    # tries again, and save() raises until the file is
+                    # readable instead of overwriting it
+                    pass
+            if isinstance(self.__objects, LazyObjects):
+                self.__objects.release()
 
-    def get(self, cls, id):
-        """Retrieve one object based on class and id"""
+    def __stamp(self):
+        """Returns the generation number of the lock file followed by the
+        (inode, size, mtime) of the JSON file and journal"""
+        try:
+            with open(self.__file_path + ".lock", 'rb') as f:
+                stamp = (f.read(),)
+        except OSError:
+            stamp = (None,)
+        for path in (self.__file_path, self.__file_path + ".log"):
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp += (None,)
+                continue
+            stamp += ((st.st_ino, st.st_size, st.st_mtime_ns),)
+        return stamp
+
+    def generation(self):
+        """Returns a number that changes whenever the stored objects do"""
+        return self.__generation
+
+    def get(self, cls, id, load=()):
+        """Retrieve one object based on class and id (load is ignored)"""
         key = cls.__name__ + '.' + id
         return self.__objects.get(key, None)
 
+    def get_many(self, cls, ids, load=()):
+        """Retrieve the cls objects of the given ids, in the same order and
+        leaving out the missing ones (load is ignored)"""
+        found = (self.get(cls, id) for id in ids)
+        return [obj for obj in found if obj is not None]
+
     def count(self, cls=None):
         """Count number of objects in storage"""
-        return len(self.all(cls))
+        if cls is None:
+            return len(self.__objects)
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        return len(self.__buckets().get(cls, ()))
+
+    def counts(self):
+        """Returns the number of objects of each class"""
+        buckets = self.__buckets()
+        return {name: len(buckets.get(name, ())) for name in classes}
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+"""
+Contains the LazyObjects class
+"""
+
+from collections.abc import MutableMapping
+import mmap
+import os
+import sys
+
+
+class LazyObjects(MutableMapping):
+    """Maps <class name>.id to objects that are kept as compact records,
+    or as the position of their JSON text in a snapshot file, and only
+    instantiated when they are looked up"""
+
+    def __init__(self, classes):
+        """Instantiate an empty LazyObjects for the given classes"""
+        # dictionary - class name -> class of the objects to instantiate
+        self.__classes = classes
+        # dictionary - key -> (field names, *values), or slice of the JSON
+        # text in the snapshot file, or None while only live
+        self.__records = {}
+        # mmap - read only mapping of the snapshot file the slices point
+        # into, shared with the other processes mapping the same file
+        self.__map = None
+        # function - decodes the bytes of a slice of the snapshot file
+        self.__loads = None
+        # dictionary - key -> object instantiated from its record
+        self.__live = {}
+        # dictionary - field names tuple -> itself, shared by the records
+        self.__shapes = {}
+
+    def __getitem__(self, key):
+        """Returns the object at key, instantiating it if needed"""
+        obj = self.__live.get(key)
+        if obj is None:
+            obj = self.decode(key, self.__records[key])
+            obj = self.__live.setdefault(key, obj)
+        return obj
+
+    def __setitem__(self, key, obj):
+        """Stores the live object obj at key"""
+        self.__live[key] = obj
+        self.__records[key] = None
+
+    def __delitem__(self, key):
+        """Removes the object at key"""
+        del self.__records[key]
+        self.__live.pop(key, None)
+
+    def __iter__(self):
+        """Iterates over the keys without instantiating anything"""
+        return iter(self.__records)
+
+    def __len__(self):
+        """Returns the number of objects"""
+        return len(self.__records)
+
+    def __contains__(self, key):
+        """Tells whether there is an object at key"""
+        return key in self.__records
+
+    def clear(self):
+        """Removes every object without instantiating anything"""
+        self.__records.clear()
+        self.__live.clear()
+
+    def load(self, key, data):
+        """Stores the to_dict() dictionary data of an object at key"""
+        self.__records[key] = self.encode(key, data)
+        self.__live.pop(key, None)
+
+    def index(self, fd, positions, loads):
+        """Stores a file position record for every object of positions,
+        whose slices of the snapshot file open as fd are decoded by loads"""
+        for key, record in self.__records.items():
+            if type(record) is slice and key not in positions:
+                self.__records[key] = self.encode(key, self.to_dict(key))
+        for key, record in positions.items():
+            self.__records[key] = record
+            self.__live.pop(key, None)
+        self.__loads = loads
+        self.__remap(fd)
+
+    def rebase(self, fd, positions):
+        """Points the file position records at the snapshot file open as fd,
+        whose objects are found at the slices of positions"""
+        for key, record in self.__records.items():
+            if type(record) is slice:
+                self.__records[key] = positions[key]
+        self.__remap(fd)
+
+    def __remap(self, fd):
+        """Maps the snapshot file open as fd in place of the previous one
+        and closes fd"""
+        old = self.__map
+        try:
+            if os.fstat(fd).st_size:
+                self.__map = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+            else:
+                self.__map = None
+        finally:
+            os.close(fd)
+        if old is not None:
+            old.close()
+
+    def raw(self, key, dumps):
+        """Returns the encoded to_dict() dictionary at key, as found in the
+        snapshot file if the object was not instantiated, else by dumps"""
+        record = self.__records[key]
+        if type(record) is slice and key not in self.__live:
+            return self.__read(record)
+        return dumps(self.to_dict(key))
+
+    def __read(self, record):
+        """Returns the bytes of the snapshot file covered by record"""
+        return self.__map[record]
+
+    def peek(self, key):
+        """Returns the object at key without keeping it if it has to be
+        instantiated, or None if there is none"""
+        obj = self.__live.get(key)
+        if obj is None:
+            record = self.__records.get(key)
+            if record is not None:
+                obj = self.decode(key, record)
+        return obj
+
+    def loaded(self, key):
+        """Returns the object at key if it is instantiated, else None"""
+        return self.__live.get(key)
+
+    def to_dict(self, key):
+        """Returns the to_dict() dictionary of the object at key"""
+        obj = self.__live.get(key)
+        if obj is not None:
+            return obj.to_dict()
+        return self.__unpack(key, self.__records[key])
+
+    def release(self):
+        """Turns every instantiated object back into a record"""
+        for key in list(self.__live):
+            obj = self.__live.get(key)
+            if obj is not None:
+                self.__records[key] = self.encode(key, obj.to_dict())
+                self.__live.pop(key, None)
+
+    def encode(self, key, data):
+        """Returns the record of the to_dict() dictionary data stored at
+        key, leaving out the id that the key already holds"""
+        shape = tuple(name for name in data
+                      if name != "id" or data["id"] != key.split(".", 1)[1])
+        shape = self.__shapes.setdefault(shape, shape)
+        values = [shape]
+        for name in shape:
+            value = data[name]
+            if type(value) is list:
+                value = tuple(value)
+            elif type(value) is str and \
+                    (name.endswith("_id") or name == "__class__"):
+                value = sys.intern(value)
+            values.append(value)
+        return tuple(values)
+
+    def __unpack(self, key, record):
+        """Returns the to_dict() dictionary stored as record at key"""
+        if type(record) is slice:
+            return self.__loads(self.__read(record))
+        data = dict(zip(record[0], record[1:]))
+        for name, value in data.items():
+            if type(value) is tuple:
+                data[name] = list(value)
+        data.setdefault("id", key.split(".", 1)[1])
+        return data
+
+    def decode(self, key, record):
+        """Returns the object rebuilt from the record stored at key"""
+        data = self.__unpack(key, record)
+        return self.__classes[data["__class__"]].from_dict(data)
@@ -0,0 +1,25 @@
+#!/usr/bin/python3
+"""
+Brings an existing database up to date with the models, which reload()
+leaves to this explicit step as creating indexes on large tables takes a
+while and must not run in every process starting up:
+
+    HBNB_TYPE_STORAGE=db python3 -m models.engine.migrate
+"""
+
+import sys
+
+
+def main():
+    """Creates the missing indexes and prints their names"""
+    import models
+    if models.storage_t != "db":
+        sys.exit("set HBNB_TYPE_STORAGE=db to migrate the database")
+    created = models.storage.migrate()
+    for name in created:
+        print("created index {}".format(name))
+    print("{} indexes created".format(len(created)))
+
+
+if __name__ == "__main__":
+    main()
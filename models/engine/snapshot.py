@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+"""
+Contains the readers and writers of the FileStorage snapshot formats,
+and a converter between them:
+
+    python3 -m models.engine.snapshot file.json file.bin
+"""
+
+import json
+import marshal
+import mmap
+import struct
+import sys
+
+# bytes - first bytes of a binary snapshot
+MAGIC = b"HBNB\x02"
+# struct - marshal format version the records of a binary snapshot are
+# written with, and offset of its index, stored after MAGIC
+HEADER = struct.Struct("<IQ")
+
+
+def encode_json(data):
+    """Returns the JSON text of data as bytes"""
+    return json.dumps(data).encode()
+
+
+def write_json(f, records):
+    """Writes the (key, JSON bytes) pairs of records to the binary file f
+    as a JSON object holding one object per line, and returns the slice
+    of the file holding each object"""
+    positions = {}
+    f.write(b"{")
+    pos = 1
+    separator = b"\n"
+    for key, value in records:
+        head = separator + json.dumps(key).encode() + b": "
+        f.write(head)
+        f.write(value)
+        pos += len(head)
+        positions[key] = slice(pos, pos + len(value))
+        pos += len(value)
+        separator = b",\n"
+    f.write(b"\n}")
+    return positions
+
+
+def json_positions(f):
+    """Returns the slice holding each object of the JSON snapshot read from
+    the binary file f, or None if it does not hold one object per line
+    between a first and a last line of its own"""
+    positions = {}
+    pos = 0
+    closed = False
+    for line in f:
+        end = pos + len(line)
+        if closed:
+            return None
+        if line.rstrip() in (b"{", b"}", b"{}"):
+            closed = pos > 0 or line.rstrip() == b"{}"
+            pos = end
+            continue
+        split = line.find(b'": ')
+        if not line.startswith(b'"') or split < 0 or pos == 0:
+            return None
+        value = line.rstrip(b",\r\n")
+        positions[line[1:split].decode()] = slice(pos + split + 3,
+                                                  pos + len(value))
+        pos = end
+    return positions if closed else None
+
+
+def write_binary(f, records):
+    """Writes the (key, marshal bytes) pairs of records to the binary file
+    f followed by their index, and returns the slice of the file holding
+    each object"""
+    positions = {}
+    f.write(MAGIC + HEADER.pack(marshal.version, 0))
+    pos = len(MAGIC) + HEADER.size
+    for key, value in records:
+        f.write(value)
+        positions[key] = slice(pos, pos + len(value))
+        pos += len(value)
+    f.write(marshal.dumps({key: (s.start, s.stop)
+                           for key, s in positions.items()}))
+    f.seek(len(MAGIC))
+    f.write(HEADER.pack(marshal.version, pos))
+    return positions
+
+
+def index_offset(head):
+    """Returns the offset of the index of the binary snapshot starting with
+    the bytes head, raising ValueError if it is not one this interpreter
+    can read, as the marshal format changes between Python versions"""
+    if head[:len(MAGIC)] != MAGIC or len(head) < len(MAGIC) + HEADER.size:
+        raise ValueError("not a binary snapshot")
+    version, offset = HEADER.unpack_from(head, len(MAGIC))
+    if version != marshal.version:
+        raise ValueError("binary snapshot written with marshal version {}, "
+                         "this interpreter reads version {}: convert it to "
+                         "JSON with the interpreter that wrote it".format(
+                             version, marshal.version))
+    return offset
+
+
+def binary_positions(f):
+    """Returns the slice holding each object of the binary snapshot read
+    from the binary file f"""
+    f.seek(index_offset(f.read(len(MAGIC) + HEADER.size)))
+    index = marshal.loads(f.read())
+    return {key: slice(start, stop) for key, (start, stop) in index.items()}
+
+
+def read_binary(f):
+    """Returns the dictionary of all the to_dict() dictionaries of the
+    binary snapshot read from the binary file f"""
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        index = marshal.loads(data[index_offset(data):])
+        return {key: marshal.loads(data[start:stop])
+                for key, (start, stop) in index.items()}
+
+
+def convert(source, target):
+    """Writes the snapshot at source to target in the other format and
+    returns the number of objects"""
+    with open(source, "rb") as f:
+        binary = f.read(len(MAGIC)) == MAGIC
+        f.seek(0)
+        objects = read_binary(f) if binary else json.load(f)
+    with open(target, "wb") as f:
+        if binary:
+            write_json(f, ((key, encode_json(data))
+                           for key, data in objects.items()))
+        else:
+            write_binary(f, ((key, marshal.dumps(data))
+                             for key, data in objects.items()))
+    return len(objects)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: {} SOURCE TARGET".format(sys.argv[0]))
+    print("{} objects".format(convert(sys.argv[1], sys.argv[2])))
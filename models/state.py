@@ -13,8 +13,8 @@ class State(BaseModel, Base):
     """Representation of state """
     if models.storage_t == "db":
         __tablename__ = 'states'
-        name = Column(String(128), nullable=False)
-        cities = relationship("City", backref="state")
+        name = Column(String(128), nullable=False, index=True)
+        cities = relationship("City", backref="state", order_by="City.name")
     else:
         name = ""
 
@@ -25,10 +25,7 @@ class State(BaseModel, Base):
     if models.storage_t != "db":
         @property
         def cities(self):
-            """getter for list of city instances related to the state"""
-            city_list = []
-            all_cities = models.storage.all(City)
-            for city in all_cities.values():
-                if city.state_id == self.id:
-                    city_list.append(city)
-            return city_list
+            """getter for list of city instances related to the state,
+            ordered by name"""
+            return sorted(models.storage.related(City, "state_id", self.id),
+                          key=lambda city: city.name)
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+"""
+Times BaseModel.to_dict() and BaseModel.to_dicts() against the former
+strftime() implementation of to_dict()
+
+Usage: python3 -m tests.bench_to_dict [number of places]
+"""
+
+import models
+from models.base_model import time
+from models.place import Place
+import sys
+import timeit
+
+# Runs of each benchmark; timeit turns the GC off while timing them
+repeat = 7
+
+
+def old_to_dict(obj):
+    """returns the to_dict() dictionary of obj as it used to be built"""
+    new_dict = obj.__dict__.copy()
+    if "created_at" in new_dict:
+        new_dict["created_at"] = new_dict["created_at"].strftime(time)
+    if "updated_at" in new_dict:
+        new_dict["updated_at"] = new_dict["updated_at"].strftime(time)
+    new_dict["__class__"] = obj.__class__.__name__
+    if "_sa_instance_state" in new_dict:
+        del new_dict["_sa_instance_state"]
+    if "password" in new_dict and models.storage_t == "db":
+        del new_dict["password"]
+    return new_dict
+
+
+def places(n):
+    """Returns n places with the attributes the API fills in"""
+    return [Place(city_id="city", user_id="user", name="Place {}".format(i),
+                  description="A place", number_rooms=2, number_bathrooms=1,
+                  max_guest=4, price_by_night=100, latitude=1.5,
+                  longitude=2.5) for i in range(n)]
+
+
+def main():
+    """Prints the best time of each way of serializing the places"""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    objs = places(n)
+    expected = [old_to_dict(obj) for obj in objs]
+    if [obj.to_dict() for obj in objs] != expected or \
+            Place.to_dicts(objs) != expected:
+        sys.exit("to_dict() and the old implementation disagree")
+    benchmarks = [
+        ("old to_dict", lambda: [old_to_dict(obj) for obj in objs]),
+        ("new to_dict", lambda: [obj.to_dict() for obj in objs]),
+        ("new to_dicts", lambda: Place.to_dicts(objs)),
+    ]
+    print("{} Place objects, best of {} with the GC off:".format(n, repeat))
+    for name, func in benchmarks:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("  {:<13} {:.3f}s".format(name, best))
+
+
+if __name__ == "__main__":
+    main()
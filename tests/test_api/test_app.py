@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+"""
+Contains the TestAppDocs, TestResponseCache and TestETag classes
+"""
+
+from api.v1 import app as app_module
+import models
+from models.city import City
+from models.state import State
+import pep8
+import unittest
+from unittest import mock
+app = app_module.app
+
+
+class TestAppDocs(unittest.TestCase):
+    """Class for testing the documentation of the API application"""
+    def test_pep8_conformance_app(self):
+        """Test that api/v1/app.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/app.py',
+                                    'tests/test_api/test_app.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test the cache of GET responses"""
+    def setUp(self):
+        """Enable an empty response cache"""
+        patcher = mock.patch.object(app_module, "cache_enabled", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(app_module.cache, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+
+    def test_caches_storage_views(self):
+        """Test that responses derived from storage are cached"""
+        self.assertEqual(self.client.get("/api/v1/stats").status_code, 200)
+        self.assertIn("/api/v1/stats?", app_module.cache)
+
+    def test_skips_other_views(self):
+        """Test that the status and pool statistics are never cached"""
+        self.assertEqual(self.client.get("/api/v1/status").status_code, 200)
+        self.client.get("/api/v1/stats/pool")
+        self.assertEqual(app_module.cache, {})
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_pool_stats_not_stale(self):
+        """Test that the pool statistics are read on every request"""
+        with mock.patch.object(models.storage, "pool_stats",
+                               side_effect=[{"pool": "a"}, {"pool": "b"}]):
+            self.assertEqual(self.client.get(
+                "/api/v1/stats/pool").get_json(), {"pool": "a"})
+            self.assertEqual(self.client.get(
+                "/api/v1/stats/pool").get_json(), {"pool": "b"})
+
+
+class TestETag(unittest.TestCase):
+    """Test the ETag and conditional GET of JSON responses, served from
+    the response cache or not"""
+    def setUp(self):
+        """Save a state whose cities are requested"""
+        self.state = State(name="Alberta")
+        models.storage.new(self.state)
+        models.storage.save()
+        self.created = [self.state]
+        self.addCleanup(self.remove)
+        patcher = mock.patch.dict(app_module.cache, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.test_client()
+        self.url = "/api/v1/states/{}/cities".format(self.state.id)
+
+    def remove(self):
+        """Delete the objects saved by the test"""
+        for obj in reversed(self.created):
+            found = models.storage.get(type(obj), obj.id)
+            if found is not None:
+                models.storage.delete(found)
+        models.storage.save()
+
+    def add_city(self, name):
+        """Saves a new city of the state"""
+        city = City(name=name, state_id=self.state.id)
+        models.storage.new(city)
+        models.storage.save()
+        self.created.append(city)
+
+    def check_conditional(self, cached):
+        """Test that the response has an ETag that If-None-Match turns
+        into a 304, and that a write changes both the ETag and the body"""
+        with mock.patch.object(app_module, "cache_enabled", cached):
+            self.add_city("Calgary")
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            etag = response.headers.get("ETag")
+            self.assertIsNotNone(etag)
+            body = response.get_json()
+            self.assertEqual([city["name"] for city in body], ["Calgary"])
+            self.assertEqual(self.url + "?" in app_module.cache, cached)
+            response = self.client.get(self.url,
+                                       headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.get_data(), b"")
+            self.assertEqual(response.headers["ETag"], etag)
+            self.add_city("Banff")
+            response = self.client.get(self.url,
+                                       headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.headers["ETag"], etag)
+            self.assertCountEqual(
+                [city["name"] for city in response.get_json()],
+                ["Banff", "Calgary"])
+
+    def test_uncached(self):
+        """Test conditional GETs answered by the views"""
+        self.check_conditional(False)
+
+    def test_cached(self):
+        """Test conditional GETs answered from the response cache"""
+        self.check_conditional(True)
+
+    def test_cache_hit(self):
+        """Test that a cached response is revalidated without storage"""
+        with mock.patch.object(app_module, "cache_enabled", True):
+            etag = self.client.get(self.url).headers["ETag"]
+            with mock.patch.object(models.storage, "page",
+                                   side_effect=AssertionError):
+                response = self.client.get(
+                    self.url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+                response = self.client.get(self.url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers["ETag"], etag)
+
+
+if __name__ == '__main__':
+    unittest.main()
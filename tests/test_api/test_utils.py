@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+"""
+Contains the TestUtilsDocs, TestJsonifyPage and TestPagination classes
+"""
+
+from api.v1 import utils
+from api.v1.app import app
+from datetime import datetime
+from flask import Flask
+import models
+from models.city import City
+from models.state import State
+import pep8
+import unittest
+from unittest import mock
+
+
+class TestUtilsDocs(unittest.TestCase):
+    """Class for testing the documentation of the API helpers"""
+    def test_pep8_conformance_utils(self):
+        """Test that api/v1/utils.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['api/v1/utils.py',
+                                    'tests/test_api/test_utils.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_utils_module_docstring(self):
+        """Test for the utils.py module docstring"""
+        self.assertIsNot(utils.__doc__, None,
+                         "utils.py needs a docstring")
+
+
+class TestJsonifyPage(unittest.TestCase):
+    """Test the serialization of collections by jsonify_page"""
+    def setUp(self):
+        """Set up an application context and count the objects consumed"""
+        self.app = Flask(__name__)
+        self.consumed = 0
+
+    def states(self, n):
+        """Yields n states, counting those consumed"""
+        for i in range(n):
+            self.consumed += 1
+            yield State(name=str(i))
+
+    def test_small_generator(self):
+        """Test that a short generator is answered in one response"""
+        with self.app.test_request_context():
+            response = utils.jsonify_page(self.states(3), None)
+        self.assertFalse(response.is_streamed)
+        self.assertEqual([state["name"] for state in response.get_json()],
+                         ["0", "1", "2"])
+
+    def test_generator_consumed_lazily(self):
+        """Test that a long generator is only read as it is streamed"""
+        with mock.patch.object(utils, "stream_min", 10), \
+                mock.patch.object(utils, "stream_chunk", 5):
+            with self.app.test_request_context():
+                response = utils.jsonify_page(self.states(100), None)
+                self.assertTrue(response.is_streamed)
+                self.assertEqual(self.consumed, 10)
+                chunks = iter(response.response)
+                next(chunks)
+                self.assertLess(self.consumed, 100)
+                body = "".join(chunks)
+        self.assertEqual(self.consumed, 100)
+        self.assertTrue(body.endswith("}]"))
+
+    def test_hidden_keys(self):
+        """Test that hidden keys are left out, streamed or not"""
+        for n in (3, 30):
+            with self.subTest(n=n), \
+                    mock.patch.object(utils, "stream_min", 10):
+                with self.app.test_request_context():
+                    response = utils.jsonify_page(self.states(n), None,
+                                                  hidden=["name"])
+                    streamed = response.is_streamed
+                    body = response.get_json()
+                self.assertEqual(streamed, n >= 10)
+                self.assertEqual(len(body), n)
+                self.assertFalse(any("name" in state for state in body))
+
+    def test_empty_stream(self):
+        """Test that an empty collection streams an empty array"""
+        with self.app.test_request_context():
+            response = utils.stream_json(iter(()))
+            self.assertEqual(response.get_json(), [])
+
+
+class TestPagination(unittest.TestCase):
+    """Test the limit and cursor parameters of a collection endpoint"""
+    def setUp(self):
+        """Save a state with five cities created a second apart"""
+        self.state = State(name="Alberta")
+        models.storage.new(self.state)
+        models.storage.save()
+        self.cities = [City(name=str(i), state_id=self.state.id)
+                       for i in range(5)]
+        for i, city in enumerate(self.cities):
+            city.created_at = datetime(2017, 9, 28, 21, 3, i)
+        for city in reversed(self.cities):
+            models.storage.new(city)
+        models.storage.save()
+        self.addCleanup(self.remove)
+        self.client = app.test_client()
+        self.url = "/api/v1/states/{}/cities".format(self.state.id)
+
+    def remove(self):
+        """Delete the state and cities saved by setUp"""
+        for obj in self.cities + [self.state]:
+            found = models.storage.get(type(obj), obj.id)
+            if found is not None:
+                models.storage.delete(found)
+        models.storage.save()
+
+    def names(self, response):
+        """Returns the names of the cities in response"""
+        self.assertEqual(response.status_code, 200)
+        return [city["name"] for city in response.get_json()]
+
+    def test_follow_cursor(self):
+        """Test that following X-Next-Cursor walks every city in order"""
+        response = self.client.get(self.url + "?limit=2")
+        self.assertEqual(self.names(response), ["0", "1"])
+        pages = [self.names(response)]
+        while "X-Next-Cursor" in response.headers:
+            response = self.client.get(self.url, query_string={
+                "limit": 2, "cursor": response.headers["X-Next-Cursor"]})
+            pages.append(self.names(response))
+        self.assertEqual(pages, [["0", "1"], ["2", "3"], ["4"]])
+
+    def test_cursor_without_limit(self):
+        """Test that a cursor alone returns everything after it"""
+        response = self.client.get(self.url + "?limit=3")
+        response = self.client.get(self.url, query_string={
+            "cursor": response.headers["X-Next-Cursor"]})
+        self.assertEqual(self.names(response), ["3", "4"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_unpaginated(self):
+        """Test that no limit returns every city without a cursor"""
+        response = self.client.get(self.url)
+        self.assertCountEqual(self.names(response), list("01234"))
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_bad_parameters(self):
+        """Test that an invalid limit or cursor is a bad request"""
+        for query in ("limit=0", "limit=-1", "limit=two", "cursor=nope",
+                      "limit=2&cursor=bm9wZQ=="):
+            with self.subTest(query=query):
+                response = self.client.get(self.url + "?" + query)
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -138,6 +138,22 @@ class TestBaseModel(unittest.TestCase):
         self.assertEqual(new_d["created_at"], bm.created_at.strftime(t_format))
         self.assertEqual(new_d["updated_at"], bm.updated_at.strftime(t_format))
 
+    def test_to_dict_whole_seconds(self):
+        """test that to_dict keeps microseconds of whole second datetimes"""
+        bm = BaseModel()
+        bm.created_at = datetime(2017, 9, 28, 21, 3, 54)
+        self.assertEqual(bm.to_dict()["created_at"],
+                         "2017-09-28T21:03:54.000000")
+
+    def test_to_dicts(self):
+        """test that to_dicts returns the to_dict of every instance"""
+        insts = [BaseModel(), BaseModel()]
+        self.assertEqual(BaseModel.to_dicts(insts),
+                         [inst.to_dict() for inst in insts])
+        for new_dict in BaseModel.to_dicts(insts, ["id", "nope"]):
+            self.assertNotIn("id", new_dict)
+            self.assertIn("created_at", new_dict)
+
     def test_str(self):
         """test that the str method has the correct output"""
         inst = BaseModel()
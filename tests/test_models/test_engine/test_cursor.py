@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+"""
+Contains the TestCursorDocs and TestCursor classes
+"""
+
+import base64
+from datetime import datetime
+import inspect
+from models.engine import cursor
+from models.engine.cursor import decode_cursor, encode_cursor
+from models.state import State
+import pep8
+import unittest
+
+
+class TestCursorDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the cursor module"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.cursor_f = inspect.getmembers(cursor, inspect.isfunction)
+
+    def test_pep8_conformance_cursor(self):
+        """Test that models/engine/cursor.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/cursor.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_cursor(self):
+        """Test tests/test_models/test_engine/test_cursor.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_cursor.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_cursor_module_docstring(self):
+        """Test for the cursor.py module docstring"""
+        self.assertIsNot(cursor.__doc__, None,
+                         "cursor.py needs a docstring")
+        self.assertTrue(len(cursor.__doc__) >= 1,
+                        "cursor.py needs a docstring")
+
+    def test_cursor_func_docstrings(self):
+        """Test for the presence of docstrings in cursor functions"""
+        for func in self.cursor_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestCursor(unittest.TestCase):
+    """Test the encoding and decoding of keyset cursors"""
+    def test_round_trip(self):
+        """Test that decode_cursor returns what encode_cursor was given"""
+        state = State(name="Alberta")
+        for created_at in (datetime(2017, 9, 28, 21, 3, 54, 52298),
+                           datetime(2017, 9, 28, 21, 3, 54)):
+            with self.subTest(created_at=created_at):
+                state.created_at = created_at
+                self.assertEqual(decode_cursor(encode_cursor(state)),
+                                 (created_at, state.id))
+
+    def test_id_with_separator(self):
+        """Test that an id holding the separator survives the round trip"""
+        state = State(name="Alberta", id="a|b")
+        self.assertEqual(decode_cursor(encode_cursor(state))[1], "a|b")
+
+    def test_url_safe(self):
+        """Test that cursors need no escaping in a query string"""
+        state = State(name="Alberta", id="\xff\xfe?>" * 8)
+        self.assertNotRegex(encode_cursor(state), r"[^A-Za-z0-9_=-]")
+
+    def test_malformed(self):
+        """Test that malformed cursors raise ValueError"""
+        for text in ("", "nope", "!!!!", "bm9wZQ", "\xe9",
+                     base64.urlsafe_b64encode(b"nope").decode(),
+                     base64.urlsafe_b64encode(b"2017|id").decode(),
+                     base64.urlsafe_b64encode(b"\xff|id").decode()):
+            with self.subTest(text=text):
+                self.assertRaises(ValueError, decode_cursor, text)
+
+
+if __name__ == '__main__':
+    unittest.main()
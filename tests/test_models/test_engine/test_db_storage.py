@@ -7,6 +7,7 @@ from datetime import datetime
 import inspect
 import models
 from models.engine import db_storage
+from models.engine.cursor import encode_cursor
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -17,12 +18,25 @@ from models.user import User
 import json
 import os
 import pep8
+import sqlalchemy
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError
+import tempfile
+import threading
 import unittest
+from unittest import mock
 DBStorage = db_storage.DBStorage
 classes = {"Amenity": Amenity, "City": City, "Place": Place,
            "Review": Review, "State": State, "User": User}
 
 
+def tearDownModule():
+    """Removes the files the file storage tests saved to"""
+    for path in ("file.json", "file.json.lock"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
 class TestDBStorageDocs(unittest.TestCase):
     """Tests to check the documentation and style of DBStorage class"""
     @classmethod
@@ -112,3 +126,363 @@ class TestFileStorage(unittest.TestCase):
         count_states = models.storage.count(State)
 
         self.assertEqual(all_states, count_states)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_count_db(self):
+        """Test that count and counts agree with all"""
+        state = State(name="Alberta")
+        models.storage.new(state)
+        models.storage.save()
+        counts = models.storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], len(models.storage.all(cls)))
+            self.assertEqual(counts[name], models.storage.count(cls))
+        self.assertEqual(models.storage.count(), len(models.storage.all()))
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_get_many_db(self):
+        """Test that get uses the session and get_many a single query"""
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            models.storage.new(state)
+        models.storage.save()
+        ids = [state.id for state in states]
+        engine = models.storage._DBStorage__engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            self.assertIs(models.storage.get(State, ids[0]), states[0])
+            self.assertEqual(statements, [])
+            models.storage.close()
+            found = models.storage.get_many(State, ids[::-1] + ["nope"])
+            self.assertEqual([state.id for state in found], ids[::-1])
+            self.assertEqual(len(statements), 1)
+            self.assertEqual(models.storage.get_many(State, ids), found[::-1])
+            self.assertEqual(len(statements), 1)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    def count_statements(self, func):
+        """Returns the number of statements sent to the database by func"""
+        engine = models.storage._DBStorage__engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            func()
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        return len(statements)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_eager_loading_db(self):
+        """Test that load= fetches relationships without a query each"""
+        user = User(email="a@b.c", password="pwd")
+        state = State(name="Alberta")
+        models.storage.new(user)
+        models.storage.new(state)
+        models.storage.save()
+        city = City(name="Calgary", state_id=state.id)
+        models.storage.new(city)
+        models.storage.save()
+        place = Place(name="Loft", city_id=city.id, user_id=user.id)
+        place.amenities.append(Amenity(name="Wifi"))
+        place.amenities.append(Amenity(name="Pool"))
+        models.storage.new(place)
+        models.storage.save()
+        models.storage.close()
+
+        def cities_and_places():
+            """Walks every state, its cities and their places"""
+            for state in models.storage.all(
+                    State, load=["cities.places"]).values():
+                for city in state.cities:
+                    city.places
+        self.assertEqual(self.count_statements(cities_and_places), 3)
+        models.storage.close()
+
+        def place_amenities():
+            """Gets the place and its amenities"""
+            found = models.storage.get(Place, place.id,
+                                       load={"amenities": "joined"})
+            self.assertEqual(len(found.amenities), 2)
+        self.assertEqual(self.count_statements(place_amenities), 1)
+        models.storage.close()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_eager_loading_collections_db(self):
+        """Test that all, iterate and get_many load collections with both
+        strategies, iterate loading joined ones with selectin"""
+        user = User(email="a@b.c", password="pwd")
+        state = State(name="Alberta")
+        models.storage.new(user)
+        models.storage.new(state)
+        models.storage.save()
+        cities = [City(name=name, state_id=state.id)
+                  for name in ("Banff", "Calgary")]
+        for city in cities:
+            models.storage.new(city)
+        models.storage.save()
+        place = Place(name="Loft", city_id=cities[0].id, user_id=user.id)
+        place.amenities.append(Amenity(name="Wifi"))
+        place.amenities.append(Amenity(name="Pool"))
+        models.storage.new(place)
+        models.storage.save()
+        models.storage.close()
+        for strategy in ("selectin", "joined"):
+            with self.subTest(strategy=strategy):
+                load = {"cities": strategy}
+                found = models.storage.all(State, load=load)
+                self.assertEqual(
+                    [city.name for city in found["State." + state.id].cities],
+                    ["Banff", "Calgary"])
+                for found in models.storage.iterate(State, load=load):
+                    if found.id == state.id:
+                        self.assertEqual(len(found.cities), 2)
+                load = {"amenities": strategy, "cities.state": strategy}
+                found = [obj for obj in
+                         models.storage.iterate(Place, load=load)
+                         if obj.id == place.id]
+                self.assertEqual(len(found[0].amenities), 2)
+                found = models.storage.get_many(Place, [place.id], load=load)
+                self.assertEqual(len(found[0].amenities), 2)
+                models.storage.close()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_iterate_db(self):
+        """Test that iterate streams the objects of a class or of all"""
+        state = State(name="Alberta")
+        models.storage.new(state)
+        models.storage.save()
+        states = list(models.storage.iterate(State))
+        self.assertIn(state, states)
+        self.assertTrue(all(type(obj) is State for obj in states))
+        self.assertEqual(len(list(models.storage.iterate())),
+                         models.storage.count())
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_all_buffered_db(self):
+        """Test that all fetches its rows without a server-side cursor,
+        which MySQLdb cannot share with the queries of selectin loads"""
+        engine = models.storage._DBStorage__engine
+        streamed = []
+
+        def record(conn, cursor, statement, parameters, context, many):
+            """Records the statements run with a server-side cursor"""
+            if context.execution_options.get("stream_results"):
+                streamed.append(statement)
+        models.storage.new(State(name="Alberta"))
+        models.storage.save()
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            models.storage.all(State, load=["cities"])
+            self.assertEqual(streamed, [])
+            list(models.storage.iterate(State))
+            self.assertNotEqual(streamed, [])
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_search_places_db(self):
+        """Test place search by state, city and amenities in the database"""
+        user = User(email="a@b.c", password="pwd")
+        alberta = State(name="Alberta")
+        yukon = State(name="Yukon")
+        for obj in (user, alberta, yukon):
+            models.storage.new(obj)
+        models.storage.save()
+        calgary = City(name="Calgary", state_id=alberta.id)
+        banff = City(name="Banff", state_id=yukon.id)
+        models.storage.new(calgary)
+        models.storage.new(banff)
+        models.storage.save()
+        wifi = Amenity(name="Wifi")
+        pool = Amenity(name="Pool")
+        loft = Place(name="Loft", city_id=calgary.id, user_id=user.id)
+        hut = Place(name="Hut", city_id=calgary.id, user_id=user.id)
+        cabin = Place(name="Cabin", city_id=banff.id, user_id=user.id)
+        loft.amenities.extend([wifi, pool])
+        cabin.amenities.append(wifi)
+        for place in (loft, hut, cabin):
+            models.storage.new(place)
+        models.storage.save()
+        models.storage.close()
+
+        def names(*args):
+            """Returns the names of the places search_places finds"""
+            return sorted(place.name for place in
+                          models.storage.search_places(*args))
+        cities = [calgary.id, banff.id]
+        self.assertLessEqual({"Cabin", "Hut", "Loft"}, set(names()))
+        self.assertEqual(names([alberta.id]), ["Hut", "Loft"])
+        self.assertEqual(names([alberta.id], [banff.id]),
+                         ["Cabin", "Hut", "Loft"])
+        self.assertEqual(names([alberta.id], [calgary.id]), ["Hut", "Loft"])
+        self.assertEqual(names([], cities, [wifi.id, pool.id]), ["Loft"])
+        self.assertEqual(names([], cities, [wifi.id]), ["Cabin", "Loft"])
+        self.assertEqual(names([], cities, [wifi.id, wifi.id]),
+                         ["Cabin", "Loft"])
+        self.assertEqual(names([], cities, [pool.id, "nope"]), [])
+        self.assertEqual(names([yukon.id], [], [pool.id]), [])
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_page_db(self):
+        """Test keyset pagination over (created_at, id) in the database,
+        including rows that share their created_at across pages"""
+        state = State(name="Alberta")
+        models.storage.new(state)
+        models.storage.save()
+        cities = [City(name=str(i), state_id=state.id) for i in range(5)]
+        for i, second in enumerate((0, 1, 2, 2, 3)):
+            cities[i].created_at = datetime(2017, 9, 28, 21, 3, second)
+        for city in reversed(cities):
+            models.storage.new(city)
+        models.storage.save()
+        models.storage.close()
+        ordered = sorted(cities, key=lambda city: (city.created_at, city.id))
+        ids = [city.id for city in ordered]
+        engine = models.storage._DBStorage__engine
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            """Records the statements sent to the database"""
+            statements.append(statement)
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            first = models.storage.page(City, 3, state_id=state.id)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        self.assertEqual([city.id for city in first], ids[:3])
+        self.assertEqual(len(statements), 1)
+        self.assertIn("ORDER BY cities.created_at, cities.id", statements[0])
+        self.assertIn("LIMIT", statements[0])
+        cursor = encode_cursor(first[-1])
+        rest = models.storage.page(City, 10, cursor, state_id=state.id)
+        self.assertEqual([city.id for city in rest], ids[3:])
+        rest = models.storage.page(City, None, cursor, state_id=state.id)
+        self.assertEqual([city.id for city in rest], ids[3:])
+        everything = models.storage.page(City, state_id=state.id)
+        self.assertFalse(hasattr(everything, "__len__"))
+        self.assertCountEqual([city.id for city in everything], ids)
+        self.assertRaises(ValueError, models.storage.page, City, 2, "nope")
+
+
+class TestCountingQueuePool(unittest.TestCase):
+    """Test the connection pool used by DBStorage"""
+    def test_waits_and_timeouts(self):
+        """Test that an exhausted pool counts waits and timeouts"""
+        with tempfile.NamedTemporaryFile(suffix=".db") as f:
+            engine = create_engine("sqlite:///" + f.name,
+                                   poolclass=db_storage.CountingQueuePool,
+                                   pool_size=1, max_overflow=0,
+                                   pool_timeout=0.01)
+            conn = engine.connect()
+            self.assertRaises(TimeoutError, engine.connect)
+            self.assertEqual(engine.pool.checkedout(), 1)
+            self.assertEqual(engine.pool.counters.waits, 1)
+            self.assertEqual(engine.pool.counters.timeouts, 1)
+            conn.close()
+            counters = engine.pool.counters
+            engine.dispose()
+            engine.connect().close()
+            self.assertIs(engine.pool.counters, counters)
+            self.assertEqual(counters.connects, 2)
+            self.assertEqual(counters.checkouts, 2)
+            self.assertEqual(counters.checkins, 2)
+            engine.dispose()
+
+    def test_counters_threads(self):
+        """Test that concurrent checkouts are all counted"""
+        with tempfile.NamedTemporaryFile(suffix=".db") as f:
+            engine = create_engine("sqlite:///" + f.name,
+                                   poolclass=db_storage.CountingQueuePool,
+                                   pool_size=2, max_overflow=2,
+                                   connect_args={"check_same_thread": False})
+
+            def work():
+                """Checks out and in connections"""
+                for i in range(200):
+                    engine.connect().close()
+            threads = [threading.Thread(target=work) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            counters = engine.pool.counters
+            self.assertEqual(counters.checkouts, 1600)
+            self.assertEqual(counters.checkins, 1600)
+            self.assertEqual(counters.timeouts, 0)
+            engine.dispose()
+
+
+class TestSQLite(unittest.TestCase):
+    """Test DBStorage on SQLite"""
+    def test_pragmas(self):
+        """Test that SQLite connections are switched to WAL mode"""
+        with tempfile.NamedTemporaryFile(suffix=".db") as f:
+            engine = create_engine("sqlite:///" + f.name)
+            event.listen(engine, "connect", db_storage.set_sqlite_pragmas)
+            with engine.connect() as conn:
+                self.assertEqual(conn.exec_driver_sql(
+                    "PRAGMA journal_mode").scalar(), "wal")
+                self.assertEqual(conn.exec_driver_sql(
+                    "PRAGMA foreign_keys").scalar(), 1)
+            engine.dispose()
+
+    def indexes(self, engine, table):
+        """Returns the names of the indexes of table"""
+        return [index["name"] for index in
+                sqlalchemy.inspect(engine).get_indexes(table)]
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_migrate_creates_indexes(self):
+        """Test that migrate, and not reload, adds the indexes missing from
+        existing tables, even if another process adds them meanwhile"""
+        with tempfile.NamedTemporaryFile(suffix=".db") as f:
+            url = "sqlite:///" + f.name
+            with mock.patch.dict(os.environ, {"HBNB_DB_URL": url}):
+                storage = DBStorage()
+            storage.reload()
+            engine = storage._DBStorage__engine
+            with engine.begin() as conn:
+                conn.exec_driver_sql("DROP INDEX ix_cities_state_id")
+            storage.reload()
+            self.assertNotIn("ix_cities_state_id",
+                             self.indexes(engine, "cities"))
+            self.assertEqual(storage.migrate(), ["ix_cities_state_id"])
+            self.assertIn("ix_cities_state_id",
+                          self.indexes(engine, "cities"))
+            self.assertIn("ix_places_created_at_id",
+                          self.indexes(engine, "places"))
+            index_names = db_storage.index_names
+            stale = [set()]
+
+            def racing(engine, table):
+                """Returns no index the first time, as if another process
+                created them right after"""
+                return stale.pop() if stale else index_names(engine, table)
+            with mock.patch.object(db_storage, "index_names", racing):
+                self.assertEqual(storage.migrate(), [])
+            storage.close()
+            engine.dispose()
+
+    @unittest.skipIf(models.storage_t != 'db', "not testing db storage")
+    def test_memory_url(self):
+        """Test that an in-memory database is shared by all sessions"""
+        with mock.patch.dict(os.environ, {"HBNB_DB_URL": "sqlite://"}):
+            storage = DBStorage()
+        storage.reload()
+        state = State(name="Alberta")
+        storage.new(state)
+        storage.save()
+        storage.close()
+        self.assertEqual(storage.get(State, state.id).name, "Alberta")
+        self.assertEqual(storage.pool_stats(), {"pool": "StaticPool"})
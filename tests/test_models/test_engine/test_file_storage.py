@@ -7,6 +7,10 @@ from datetime import datetime
 import inspect
 import models
 from models.engine import file_storage
+from models.engine.cursor import encode_cursor
+from models.engine.lazy_objects import LazyObjects
+from models.engine import snapshot
+from models.engine.snapshot import convert
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
@@ -15,14 +19,31 @@ from models.review import Review
 from models.state import State
 from models.user import User
 import json
+import multiprocessing
 import os
 import pep8
+import threading
+import time
 import unittest
+from unittest import mock
 FileStorage = file_storage.FileStorage
 classes = {"Amenity": Amenity, "BaseModel": BaseModel, "City": City,
            "Place": Place, "Review": Review, "State": State, "User": User}
 
 
+def remove_files(path):
+    """Removes the snapshot at path and the files saved along with it"""
+    for name in (path, path + ".lock", path + ".tmp", path + ".log",
+                 path + ".json"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def tearDownModule():
+    """Removes the files the tests saved the storage to"""
+    remove_files("file.json")
+
+
 class TestFileStorageDocs(unittest.TestCase):
     """Tests to check the documentation and style of FileStorage class"""
     @classmethod
@@ -79,11 +100,180 @@ class TestFileStorage(unittest.TestCase):
         self.assertIs(new_dict, storage._FileStorage__objects)
 
     @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_get(self):
+        """Test that retrieves object from file.json"""
+        state = State(name="Alberta")
+        models.storage.new(state)
+        models.storage.save()
+
+        state_object = models.storage.get(State, state.id)
+        self.assertEqual(state, state_object)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_count(self):
+        """Test that counts objects in file.json"""
+        all_objects = len(models.storage.all())
+        count_objects = models.storage.count()
+
+        self.assertEqual(all_objects, count_objects)
+
+        all_states = len(models.storage.all(State))
+        count_states = models.storage.count(State)
+
+        self.assertEqual(all_states, count_states)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_skips_reload_when_unchanged(self):
+        """Test that close does not re-read an unchanged file.json"""
+        state = State(name="Ontario")
+        models.storage.new(state)
+        models.storage.save()
+        models.storage.close()
+        self.assertIs(models.storage.get(State, state.id), state)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_reloads_external_changes(self):
+        """Test that close picks up objects written by another process"""
+        models.storage.save()
+        state = State(name="Quebec")
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        js["State." + state.id] = state.to_dict()
+        with open("file.json", "w") as f:
+            json.dump(js, f)
+        self.assertIsNone(models.storage.get(State, state.id))
+        models.storage.close()
+        self.assertEqual(models.storage.get(State, state.id).name, "Quebec")
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_close_drops_external_deletes(self):
+        """Test that close forgets objects deleted by another process"""
+        state = State(name="Quebec")
+        models.storage.new(state)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        del js["State." + state.id]
+        with open("file.json.tmp", "w") as f:
+            json.dump(js, f)
+        os.replace("file.json.tmp", "file.json")
+        models.storage.close()
+        self.assertIsNone(models.storage.get(State, state.id))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    @unittest.skipIf(FileStorage._FileStorage__journal,
+                     "saves go to the journal")
+    def test_unreadable_file_kept(self):
+        """Test that a snapshot that cannot be read is neither replaced by
+        an empty store on close nor overwritten by save"""
+        path = FileStorage._FileStorage__file_path
+        states = [State(name=str(i)) for i in range(5)]
+        for state in states:
+            models.storage.new(state)
+        models.storage.save()
+        with open(path, "rb") as f:
+            saved = f.read()
+        try:
+            with open(path + ".tmp", "wb") as f:
+                f.write(saved[:len(saved) // 2])
+            os.replace(path + ".tmp", path)
+            models.storage.close()
+            for state in states:
+                self.assertEqual(models.storage.get(State, state.id).name,
+                                 state.name)
+            city = City(name="Montreal")
+            models.storage.new(city)
+            self.assertRaises(Exception, models.storage.save)
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), saved[:len(saved) // 2])
+        finally:
+            with open(path + ".tmp", "wb") as f:
+                f.write(saved)
+            os.replace(path + ".tmp", path)
+        models.storage.save()
+        FileStorage._FileStorage__file_stamp = None
+        models.storage.close()
+        self.assertEqual(models.storage.get(City, city.id).name, "Montreal")
+        for state in states:
+            self.assertEqual(models.storage.get(State, state.id).name,
+                             state.name)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_save_merges_external_changes(self):
+        """Test that save keeps the objects written by another process"""
+        models.storage.save()
+        state = State(name="Quebec")
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        js["State." + state.id] = state.to_dict()
+        with open("file.json.tmp", "w") as f:
+            json.dump(js, f)
+        os.replace("file.json.tmp", "file.json")
+        city = City(name="Montreal")
+        models.storage.new(city)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        self.assertIn("State." + state.id, js)
+        self.assertIn("City." + city.id, js)
+        self.assertIs(models.storage.get(City, city.id), city)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_concurrent_writers(self):
+        """Test that processes saving at the same time lose no object"""
+        models.storage.save()
+        before = models.storage.count(State)
+
+        def write():
+            """Saves a few states one by one"""
+            for i in range(10):
+                models.storage.new(State(name="State {}".format(i)))
+                models.storage.save()
+        context = multiprocessing.get_context("fork")
+        writers = [context.Process(target=write) for i in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        models.storage.close()
+        self.assertEqual(models.storage.count(State), before + 40)
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_counts(self):
+        """Test that counts matches count for every class"""
+        counts = models.storage.counts()
+        self.assertEqual(set(counts), set(classes))
+        for name, cls in classes.items():
+            self.assertEqual(counts[name], models.storage.count(cls))
+
+    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+    def test_generation(self):
+        """Test that the generation changes with new and delete"""
+        state = State(name="Alberta")
+        before = models.storage.generation()
+        models.storage.new(state)
+        added = models.storage.generation()
+        self.assertNotEqual(before, added)
+        self.assertEqual(added, models.storage.generation())
+        models.storage.delete(state)
+        self.assertNotEqual(added, models.storage.generation())
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageEmpty(unittest.TestCase):
+    """Test the FileStorage class on a store of its own"""
+    def setUp(self):
+        """Swap in an empty store"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        """Restore the original objects"""
+        FileStorage._FileStorage__objects = self.objects
+
     def test_new(self):
         """test that new adds an object to the FileStorage.__objects attr"""
         storage = FileStorage()
-        save = FileStorage._FileStorage__objects
-        FileStorage._FileStorage__objects = {}
         test_dict = {}
         for key, value in classes.items():
             with self.subTest(key=key, value=value):
@@ -92,9 +282,7 @@ class TestFileStorage(unittest.TestCase):
                 storage.new(instance)
                 test_dict[instance_key] = instance
                 self.assertEqual(test_dict, storage._FileStorage__objects)
-        FileStorage._FileStorage__objects = save
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
     def test_save(self):
         """Test that save properly saves objects to file.json"""
         storage = FileStorage()
@@ -103,10 +291,8 @@ class TestFileStorage(unittest.TestCase):
             instance = value()
             instance_key = instance.__class__.__name__ + "." + instance.id
             new_dict[instance_key] = instance
-        save = FileStorage._FileStorage__objects
         FileStorage._FileStorage__objects = new_dict
         storage.save()
-        FileStorage._FileStorage__objects = save
         for key, value in new_dict.items():
             new_dict[key] = value.to_dict()
         string = json.dumps(new_dict)
@@ -114,25 +300,601 @@ class TestFileStorage(unittest.TestCase):
             js = f.read()
         self.assertEqual(json.loads(string), json.loads(js))
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
-    def test_get(self):
-        """Test that retrieves object from file.json"""
+    def test_threads(self):
+        """Test that threads reading and writing at once lose nothing"""
+        storage = FileStorage()
         state = State(name="Alberta")
-        models.storage.new(state)
-        models.storage.save()
+        storage.new(state)
+        errors = []
 
-        state_object = models.storage.get(State, state.id)
-        self.assertEqual(state, state_object)
+        def write():
+            """Adds cities, deleting every other one, and saves"""
+            try:
+                for i in range(50):
+                    city = City(name=str(i), state_id=state.id)
+                    storage.new(city)
+                    if i % 2:
+                        storage.delete(city)
+                    storage.save()
+            except Exception as e:
+                errors.append(e)
 
-    @unittest.skipIf(models.storage_t == 'db', "not testing file storage")
-    def test_count(self):
-        """Test that counts objects in file.json"""
-        all_objects = len(models.storage.all())
-        count_objects = models.storage.count()
+        def read():
+            """Looks the cities up in every possible way"""
+            try:
+                for i in range(100):
+                    storage.all(City)
+                    storage.related(City, "state_id", state.id)
+                    storage.page(City, 5, state_id=state.id)
+                    storage.count(City)
+                    storage.close()
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=write) for i in range(4)]
+        threads += [threading.Thread(target=read) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(storage.count(City), 100)
+        self.assertEqual(len(storage.related(City, "state_id", state.id)),
+                         100)
+        with open("file.json", "r") as f:
+            self.assertEqual(len(json.load(f)), 101)
 
-        self.assertEqual(all_objects, count_objects)
+    def test_save_encodes_changed_objects(self):
+        """Test that save only calls to_dict on the objects that changed"""
+        storage = FileStorage()
+        states = [State(name=str(i)) for i in range(5)]
+        for state in states:
+            storage.new(state)
+        storage.save()
+        states[2].name = "changed"
+        calls = []
+        to_dict = State.to_dict
 
-        all_states = len(models.storage.all(State))
-        count_states = models.storage.count(State)
+        def counting_to_dict(obj):
+            """Records the call and returns the real to_dict()"""
+            calls.append(obj)
+            return to_dict(obj)
+        State.to_dict = counting_to_dict
+        try:
+            storage.save()
+        finally:
+            State.to_dict = to_dict
+        self.assertEqual(calls, [states[2]])
+        with open("file.json", "r") as f:
+            js = json.load(f)
+        self.assertEqual(js["State." + states[2].id]["name"], "changed")
+        self.assertEqual(js["State." + states[0].id], states[0].to_dict())
 
-        self.assertEqual(all_states, count_states)
+    def test_get_many(self):
+        """Test that get_many returns the objects found, in order"""
+        storage = FileStorage()
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            storage.new(state)
+        ids = [state.id for state in states]
+        self.assertEqual(storage.get_many(State, ids[::-1] + ["nope"]),
+                         states[::-1])
+        self.assertEqual(storage.get_many(City, ids), [])
+
+    def test_iterate(self):
+        """Test that iterate yields the objects of a class or of all"""
+        storage = FileStorage()
+        state = State(name="Alberta")
+        city = City(name="Calgary", state_id=state.id)
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(list(storage.iterate(State)), [state])
+        self.assertEqual(list(storage.iterate("City")), [city])
+        self.assertCountEqual(storage.iterate(), [state, city])
+
+    def test_order_by(self):
+        """Test that all and iterate sort the objects by an attribute"""
+        storage = FileStorage()
+        states = [State(name=name) for name in ("b", "c", "a")]
+        for state in states:
+            storage.new(state)
+        storage.new(City(name="z"))
+        ordered = sorted(states, key=lambda state: state.name)
+        self.assertEqual(list(storage.all(State, order_by="name").values()),
+                         ordered)
+        self.assertEqual(list(storage.iterate("State", order_by="name")),
+                         ordered)
+        self.assertEqual(list(storage.all(order_by="name"))[0][:5], "City.")
+
+    def test_class_buckets(self):
+        """Test that all(cls) and count(cls) follow new and delete"""
+        storage = FileStorage()
+        state = State(name="Alberta")
+        city = City(name="Calgary")
+        storage.new(state)
+        storage.new(city)
+        self.assertEqual(storage.all(State), {"State." + state.id: state})
+        self.assertEqual(storage.all("City"), {"City." + city.id: city})
+        self.assertEqual(storage.count(State), 1)
+        storage.delete(state)
+        self.assertEqual(storage.all(State), {})
+        self.assertEqual(storage.count(State), 0)
+        self.assertEqual(storage.count(), 1)
+
+    def test_related(self):
+        """Test that foreign key indexes follow new, delete and setattr"""
+        storage = FileStorage()
+        alberta = State(name="Alberta")
+        yukon = State(name="Yukon")
+        city = City(name="Calgary", state_id=alberta.id)
+        for obj in (alberta, yukon, city):
+            storage.new(obj)
+        self.assertEqual(alberta.cities, [city])
+        self.assertEqual(yukon.cities, [])
+        city.state_id = yukon.id
+        self.assertEqual(alberta.cities, [])
+        self.assertEqual(yukon.cities, [city])
+        storage.delete(city)
+        self.assertEqual(storage.related(City, "state_id", yukon.id), [])
+
+    def test_search_places(self):
+        """Test place search by state, city and amenities"""
+        storage = FileStorage()
+        state = State(name="Alberta")
+        calgary = City(name="Calgary", state_id=state.id)
+        banff = City(name="Banff", state_id="elsewhere")
+        wifi = Amenity(name="Wifi")
+        pool = Amenity(name="Pool")
+        loft = Place(name="Loft", city_id=calgary.id)
+        cabin = Place(name="Cabin", city_id=banff.id)
+        loft.amenity_ids = [wifi.id, pool.id]
+        cabin.amenity_ids = [wifi.id]
+        for obj in (state, calgary, banff, wifi, pool, loft, cabin):
+            storage.new(obj)
+        self.assertCountEqual(storage.search_places(), [loft, cabin])
+        self.assertEqual(storage.search_places([state.id]), [loft])
+        self.assertCountEqual(storage.search_places([state.id], [banff.id]),
+                              [loft, cabin])
+        self.assertEqual(
+            list(storage.search_places([], [], [wifi.id, pool.id])), [loft])
+        self.assertEqual(
+            list(storage.search_places([], [banff.id], [pool.id])), [])
+
+    def test_page(self):
+        """Test keyset pagination over (created_at, id)"""
+        storage = FileStorage()
+        cities = [City(name=str(i), state_id="s") for i in range(5)]
+        for i, city in enumerate(cities):
+            city.created_at = datetime(2017, 9, 28, 21, 3, i)
+        for city in reversed(cities):
+            storage.new(city)
+        storage.new(City(name="other", state_id="t"))
+        first = storage.page(City, 2, state_id="s")
+        self.assertEqual(first, cities[:2])
+        cursor = encode_cursor(first[-1])
+        self.assertEqual(storage.page(City, 10, cursor, state_id="s"),
+                         cities[2:])
+        self.assertEqual(len(list(storage.page(City))), 6)
+        self.assertRaises(ValueError, storage.page, City, 2, "nope")
+
+    def test_reload_hydrates_objects(self):
+        """Test that reload rebuilds objects without calling __setattr__"""
+        storage = FileStorage()
+        user = User(email="a@b.c", password="pwd")
+        storage.new(user)
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        loaded = storage.get(User, user.id)
+        self.assertIsNot(loaded, user)
+        self.assertEqual(loaded.to_dict(), user.to_dict())
+        self.assertIs(type(loaded.created_at), datetime)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageJournal(unittest.TestCase):
+    """Test the journaled mode of the FileStorage class"""
+    def setUp(self):
+        """Switch FileStorage to journaled mode on an empty store"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.save()
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        """Restore the plain mode and the original objects"""
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__journal_max = 1024 * 1024
+        FileStorage._FileStorage__objects = self.objects
+        remove_files("file.json.log")
+        self.storage.save()
+
+    def test_save_appends_to_journal(self):
+        """Test that save appends records instead of rewriting file.json"""
+        state = State(name="Alberta")
+        self.storage.new(state)
+        self.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(json.load(f), {})
+        with open("file.json.log", "r") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(records, [{"key": "State." + state.id,
+                                    "value": state.to_dict()}])
+
+    def test_reload_replays_journal(self):
+        """Test that reload applies new and delete records from the log"""
+        kept = State(name="Alberta")
+        gone = State(name="Yukon")
+        self.storage.new(kept)
+        self.storage.new(gone)
+        self.storage.save()
+        self.storage.delete(gone)
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(list(self.storage.all()), ["State." + kept.id])
+        self.assertEqual(self.storage.get(State, kept.id).name, "Alberta")
+
+    def test_compaction(self):
+        """Test that a journal past its size limit is folded into the file"""
+        FileStorage._FileStorage__journal_max = 0
+        state = State(name="Alberta")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertEqual(os.path.getsize("file.json.log"), 0)
+        with open("file.json", "r") as f:
+            self.assertIn("State." + state.id, json.load(f))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageWriteBehind(unittest.TestCase):
+    """Test the FileStorage class leaving writes to a flusher thread"""
+    def setUp(self):
+        """Switch FileStorage to write-behind on an empty store"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        self.storage = FileStorage()
+        self.storage.save()
+        FileStorage._FileStorage__flush_interval = 60.0
+
+    def tearDown(self):
+        """Restore immediate writes and the original objects"""
+        FileStorage._FileStorage__flush_interval = 0.0
+        FileStorage._FileStorage__flush_max = 1000
+        self.storage.stop()
+        FileStorage._FileStorage__objects = self.objects
+        self.storage.save()
+
+    def saved(self):
+        """Returns the keys found in file.json"""
+        with open("file.json", "r") as f:
+            return list(json.load(f))
+
+    def test_save_is_deferred(self):
+        """Test that save only writes once flush is called"""
+        state = State(name="Alberta")
+        self.storage.new(state)
+        self.storage.save()
+        self.assertEqual(self.saved(), [])
+        self.storage.flush()
+        self.assertEqual(self.saved(), ["State." + state.id])
+
+    def test_flush_max(self):
+        """Test that save writes at once past the pending changes limit"""
+        FileStorage._FileStorage__flush_max = 3
+        states = [State(name=str(i)) for i in range(3)]
+        for state in states:
+            self.storage.new(state)
+            self.storage.save()
+        self.assertEqual(len(self.saved()), 3)
+
+    def test_flusher(self):
+        """Test that the flusher thread writes a burst of saves"""
+        FileStorage._FileStorage__flush_interval = 0.05
+        for i in range(100):
+            self.storage.new(State(name=str(i)))
+            self.storage.save()
+        for i in range(100):
+            if len(self.saved()) == 100:
+                break
+            time.sleep(0.05)
+        self.assertEqual(len(self.saved()), 100)
+
+    def test_stop(self):
+        """Test that stop writes the pending changes and ends the flusher
+        thread, which is registered to run at exit only once"""
+        with mock.patch.object(file_storage.atexit, "register") as register, \
+                mock.patch.object(FileStorage, "_FileStorage__at_exit", False):
+            for i in range(2):
+                state = State(name=str(i))
+                self.storage.new(state)
+                self.storage.save()
+                flusher = FileStorage._FileStorage__flusher
+                self.assertTrue(flusher.is_alive())
+                self.storage.stop()
+                self.assertFalse(flusher.is_alive())
+                self.assertIn("State." + state.id, self.saved())
+        register.assert_called_once_with(self.storage.stop)
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageCompact(unittest.TestCase):
+    """Test the FileStorage class holding compact records"""
+    def setUp(self):
+        """Switch FileStorage to compact records"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = LazyObjects(classes)
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restore the original objects"""
+        FileStorage._FileStorage__objects = self.objects
+        self.storage.save()
+
+    def test_reload_keeps_records(self):
+        """Test that reloaded objects are only instantiated on lookup"""
+        state = State(name="Alberta")
+        city = City(name="Calgary", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        self.storage.reload()
+        self.assertEqual(self.storage.count(State), 1)
+        self.assertEqual(len(self.storage.related(City, "state_id",
+                                                  state.id)), 1)
+        self.assertIsNone(objects.loaded("State." + state.id))
+        loaded = self.storage.get(State, state.id)
+        self.assertIsNot(loaded, state)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+        self.assertIs(objects.loaded("State." + state.id), loaded)
+
+    def test_close_releases_objects(self):
+        """Test that close turns instantiated objects back into records"""
+        state = State(name="Alberta")
+        self.storage.new(state)
+        self.storage.save()
+        state.name = "Alberta!"
+        self.storage.close()
+        objects = FileStorage._FileStorage__objects
+        self.assertIsNone(objects.loaded("State." + state.id))
+        self.assertEqual(objects.to_dict("State." + state.id),
+                         state.to_dict())
+        self.assertEqual(self.storage.get(State, state.id).name, "Alberta!")
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageLazy(unittest.TestCase):
+    """Test the FileStorage class indexing the JSON file on reload"""
+    def setUp(self):
+        """Switch FileStorage to lazy loading"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = LazyObjects(classes)
+        FileStorage._FileStorage__lazy = True
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        """Restore the original objects"""
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__objects = self.objects
+        self.storage.save()
+
+    def test_reload_indexes_file(self):
+        """Test that reload only decodes the objects that are looked up"""
+        state = State(name="Alberta")
+        city = City(name="Calgary", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        self.storage.reload()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertIsNone(objects.loaded("State." + state.id))
+        self.assertIsNone(objects.loaded("City." + city.id))
+        loaded = self.storage.get(State, state.id)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+        self.assertIsNone(objects.loaded("City." + city.id))
+        self.assertEqual(self.storage.all(City)["City." + city.id].name,
+                         "Calgary")
+
+    def test_iterate_keeps_nothing(self):
+        """Test that iterate does not keep the objects it decodes"""
+        state = State(name="Alberta")
+        self.storage.new(state)
+        self.storage.save()
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        self.storage.reload()
+        found = list(self.storage.iterate(State))
+        self.assertEqual([obj.to_dict() for obj in found], [state.to_dict()])
+        self.assertIsNone(objects.loaded("State." + state.id))
+
+    def test_order_by_lazy(self):
+        """Test that objects sort the same whether decoded or not"""
+        states = [State(name=name) for name in ("b", "c", "a")]
+        for state in states:
+            self.storage.new(state)
+        self.storage.save()
+        FileStorage._FileStorage__objects = LazyObjects(classes)
+        self.storage.reload()
+        self.storage.get(State, states[1].id)
+        found = self.storage.all(State, order_by="created_at").values()
+        self.assertEqual([state.id for state in found],
+                         [state.id for state in states])
+        found = self.storage.iterate(State, order_by="name")
+        self.assertEqual([state.name for state in found], ["a", "b", "c"])
+
+    def test_page_keeps_nothing(self):
+        """Test that a page only instantiates and keeps nothing"""
+        states = [State(name=str(i)) for i in range(5)]
+        for i, state in enumerate(states):
+            state.created_at = datetime(2017, 9, 28, 21, 3, i)
+            self.storage.new(state)
+        self.storage.save()
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        self.storage.reload()
+        first = self.storage.page(State, 2)
+        self.assertEqual([state.id for state in first],
+                         [state.id for state in states[:2]])
+        rest = self.storage.page(State, 10, encode_cursor(first[-1]))
+        self.assertEqual([state.id for state in rest],
+                         [state.id for state in states[2:]])
+        for state in states:
+            self.assertIsNone(objects.loaded("State." + state.id))
+
+    def test_search_places_keeps_nothing(self):
+        """Test that searching all places does not keep them"""
+        loft = Place(name="Loft", amenity_ids=["wifi"])
+        cabin = Place(name="Cabin")
+        self.storage.new(loft)
+        self.storage.new(cabin)
+        self.storage.save()
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        self.storage.reload()
+        found = self.storage.search_places()
+        self.assertCountEqual([place.id for place in found],
+                              [loft.id, cabin.id])
+        found = self.storage.search_places(amenities=["wifi"])
+        self.assertEqual([place.id for place in found], [loft.id])
+        self.assertIsNone(objects.loaded("Place." + loft.id))
+        self.assertIsNone(objects.loaded("Place." + cabin.id))
+
+    def test_save_after_reload(self):
+        """Test that saving keeps the objects that were never decoded"""
+        state = State(name="Alberta")
+        city = City(name="Calgary", state_id=state.id)
+        self.storage.new(state)
+        self.storage.new(city)
+        self.storage.save()
+        FileStorage._FileStorage__objects = LazyObjects(classes)
+        self.storage.reload()
+        self.storage.get(State, state.id).name = "Alberta!"
+        self.storage.new(State(name="Ontario"))
+        self.storage.save()
+        with open("file.json") as f:
+            saved = json.load(f)
+        self.assertEqual(len(saved), 3)
+        self.assertEqual(saved["City." + city.id], city.to_dict())
+        self.assertEqual(saved["State." + state.id]["name"], "Alberta!")
+        self.assertEqual(self.storage.all(City)["City." + city.id].name,
+                         "Calgary")
+
+    def test_mapping_outlives_file(self):
+        """Test that objects are decoded from the mapped snapshot after
+        another writer replaced the file"""
+        state = State(name="Alberta")
+        other = State(name="Ontario")
+        self.storage.new(state)
+        self.storage.new(other)
+        self.storage.save()
+        FileStorage._FileStorage__objects = LazyObjects(classes)
+        self.storage.reload()
+        with open("file.json.tmp", "w") as f:
+            json.dump({}, f)
+        os.replace("file.json.tmp", "file.json")
+        self.assertEqual(self.storage.get(State, state.id).to_dict(),
+                         state.to_dict())
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, other.id).to_dict(),
+                         other.to_dict())
+
+    def test_reload_other_layout(self):
+        """Test that a JSON file on a single line is loaded in full"""
+        state = State(name="Alberta")
+        with open("file.json", "w") as f:
+            json.dump({"State." + state.id: state.to_dict()}, f)
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, state.id).to_dict(),
+                         state.to_dict())
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestFileStorageBinary(unittest.TestCase):
+    """Test the FileStorage class keeping a binary snapshot"""
+    def setUp(self):
+        """Switch FileStorage to the binary format"""
+        self.objects = FileStorage._FileStorage__objects
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__binary = True
+        FileStorage._FileStorage__file_path = "file.bin"
+        self.storage = FileStorage()
+        self.state = State(name="Alberta")
+        self.city = City(name="Calgary", state_id=self.state.id)
+        self.storage.new(self.state)
+        self.storage.new(self.city)
+        self.storage.save()
+
+    def tearDown(self):
+        """Restore the JSON format and the original objects"""
+        FileStorage._FileStorage__binary = False
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__file_path = "file.json"
+        FileStorage._FileStorage__objects = self.objects
+        remove_files("file.bin")
+
+    def test_reload(self):
+        """Test that the objects are read back from the binary snapshot"""
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.count(), 2)
+        self.assertEqual(self.storage.get(City, self.city.id).to_dict(),
+                         self.city.to_dict())
+
+    def test_reload_lazy(self):
+        """Test that the binary snapshot is indexed in lazy mode"""
+        objects = LazyObjects(classes)
+        FileStorage._FileStorage__objects = objects
+        FileStorage._FileStorage__lazy = True
+        self.storage.reload()
+        self.assertEqual(self.storage.count(City), 1)
+        self.assertIsNone(objects.loaded("City." + self.city.id))
+        self.storage.get(State, self.state.id).name = "Alberta!"
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.get(State, self.state.id).name,
+                         "Alberta!")
+        self.assertEqual(self.storage.get(City, self.city.id).to_dict(),
+                         self.city.to_dict())
+
+    def test_other_marshal_version(self):
+        """Test that a snapshot written with another marshal version is
+        neither loaded nor overwritten"""
+        with open("file.bin", "r+b") as f:
+            f.seek(len(snapshot.MAGIC))
+            version, offset = snapshot.HEADER.unpack(
+                f.read(snapshot.HEADER.size))
+            f.seek(len(snapshot.MAGIC))
+            f.write(snapshot.HEADER.pack(version + 1, offset))
+        with open("file.bin", "rb") as f:
+            written = f.read()
+        for lazy in (False, True):
+            with self.subTest(lazy=lazy):
+                FileStorage._FileStorage__lazy = lazy
+                FileStorage._FileStorage__objects = LazyObjects(classes)
+                self.assertRaises(ValueError, self.storage.reload)
+        FileStorage._FileStorage__file_stamp = None
+        self.addCleanup(FileStorage._FileStorage__pending.clear)
+        self.storage.new(State(name="Ontario"))
+        self.assertRaises(ValueError, self.storage.save)
+        with open("file.bin", "rb") as f:
+            self.assertEqual(f.read(), written)
+
+    def test_convert(self):
+        """Test that convert writes the binary snapshot as JSON"""
+        self.assertEqual(convert("file.bin", "file.bin.json"), 2)
+        with open("file.bin.json") as f:
+            saved = json.load(f)
+        self.assertEqual(saved["State." + self.state.id],
+                         self.state.to_dict())
+        os.remove("file.bin")
+        self.assertEqual(convert("file.bin.json", "file.bin"), 2)
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.storage.get(City, self.city.id).to_dict(),
+                         self.city.to_dict())
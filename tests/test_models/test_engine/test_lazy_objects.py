@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""
+Contains the TestLazyObjectsDocs and TestLazyObjects classes
+"""
+
+import inspect
+import models
+from models.engine import lazy_objects
+from models.engine.lazy_objects import LazyObjects
+from models.city import City
+from models.state import State
+import pep8
+import unittest
+classes = {"City": City, "State": State}
+
+
+class TestLazyObjectsDocs(unittest.TestCase):
+    """Tests to check the documentation and style of LazyObjects class"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests, leaving out the methods inherited from
+        MutableMapping"""
+        cls.lo_f = [func for func in
+                    inspect.getmembers(LazyObjects, inspect.isfunction)
+                    if func[0] in vars(LazyObjects)]
+
+    def test_pep8_conformance_lazy_objects(self):
+        """Test that models/engine/lazy_objects.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/lazy_objects.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_lazy_objects(self):
+        """Test tests/test_models/test_engine/test_lazy_objects.py conforms
+        to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_lazy_objects.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_lazy_objects_module_docstring(self):
+        """Test for the lazy_objects.py module docstring"""
+        self.assertIsNot(lazy_objects.__doc__, None,
+                         "lazy_objects.py needs a docstring")
+        self.assertTrue(len(lazy_objects.__doc__) >= 1,
+                        "lazy_objects.py needs a docstring")
+
+    def test_lazy_objects_class_docstring(self):
+        """Test for the LazyObjects class docstring"""
+        self.assertIsNot(LazyObjects.__doc__, None,
+                         "LazyObjects class needs a docstring")
+        self.assertTrue(len(LazyObjects.__doc__) >= 1,
+                        "LazyObjects class needs a docstring")
+
+    def test_lo_func_docstrings(self):
+        """Test for the presence of docstrings in LazyObjects methods"""
+        for func in self.lo_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} method needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} method needs a docstring".format(func[0]))
+
+
+@unittest.skipIf(models.storage_t == 'db', "not testing file storage")
+class TestLazyObjects(unittest.TestCase):
+    """Test the LazyObjects class on compact records"""
+    def setUp(self):
+        """Load a state and one of its cities as records"""
+        self.objects = LazyObjects(classes)
+        self.state = State(name="Alberta")
+        self.city = City(name="Calgary", state_id=self.state.id)
+        for obj in (self.state, self.city):
+            self.objects.load(type(obj).__name__ + "." + obj.id,
+                              obj.to_dict())
+        self.key = "City." + self.city.id
+
+    def test_lookup(self):
+        """Test that looking a record up instantiates it once"""
+        self.assertIsNone(self.objects.loaded(self.key))
+        city = self.objects[self.key]
+        self.assertIs(type(city), City)
+        self.assertEqual(city.to_dict(), self.city.to_dict())
+        self.assertIs(self.objects.loaded(self.key), city)
+        self.assertIs(self.objects[self.key], city)
+
+    def test_peek_and_to_dict(self):
+        """Test that peek and to_dict keep nothing instantiated"""
+        self.assertEqual(self.objects.peek(self.key).to_dict(),
+                         self.city.to_dict())
+        self.assertEqual(self.objects.to_dict(self.key), self.city.to_dict())
+        self.assertIsNone(self.objects.loaded(self.key))
+        self.assertIsNone(self.objects.peek("City.nope"))
+
+    def test_release(self):
+        """Test that release turns changed objects back into records"""
+        self.objects[self.key].name = "Banff"
+        self.objects.release()
+        self.assertIsNone(self.objects.loaded(self.key))
+        self.assertEqual(self.objects.to_dict(self.key)["name"], "Banff")
+
+    def test_mapping(self):
+        """Test that keys, len, in and del work without instantiating"""
+        self.assertCountEqual(self.objects, ["State." + self.state.id,
+                                             self.key])
+        self.assertEqual(len(self.objects), 2)
+        self.assertIn(self.key, self.objects)
+        del self.objects[self.key]
+        self.assertNotIn(self.key, self.objects)
+        self.assertIsNone(self.objects.loaded("State." + self.state.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""
+Contains the TestSnapshotDocs, TestJsonSnapshot and TestBinarySnapshot
+classes
+"""
+
+import inspect
+import io
+import json
+import marshal
+from models.engine import snapshot
+import os
+import pep8
+import tempfile
+import unittest
+
+records = {"State.1": {"id": "1", "name": "Alberta", "__class__": "State"},
+           "City.2": {"id": "2", "name": "Calgary", "state_id": "1",
+                      "__class__": "City"}}
+
+
+class TestSnapshotDocs(unittest.TestCase):
+    """Tests to check the documentation and style of the snapshot module"""
+    @classmethod
+    def setUpClass(cls):
+        """Set up for the doc tests"""
+        cls.snapshot_f = inspect.getmembers(snapshot, inspect.isfunction)
+
+    def test_pep8_conformance_snapshot(self):
+        """Test that models/engine/snapshot.py conforms to PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['models/engine/snapshot.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_pep8_conformance_test_snapshot(self):
+        """Test tests/test_models/test_engine/test_snapshot.py conforms to
+        PEP8."""
+        pep8s = pep8.StyleGuide(quiet=True)
+        result = pep8s.check_files(['tests/test_models/test_engine/\
+test_snapshot.py'])
+        self.assertEqual(result.total_errors, 0,
+                         "Found code style errors (and warnings).")
+
+    def test_snapshot_module_docstring(self):
+        """Test for the snapshot.py module docstring"""
+        self.assertIsNot(snapshot.__doc__, None,
+                         "snapshot.py needs a docstring")
+        self.assertTrue(len(snapshot.__doc__) >= 1,
+                        "snapshot.py needs a docstring")
+
+    def test_snapshot_func_docstrings(self):
+        """Test for the presence of docstrings in snapshot functions"""
+        for func in self.snapshot_f:
+            self.assertIsNot(func[1].__doc__, None,
+                             "{:s} needs a docstring".format(func[0]))
+            self.assertTrue(len(func[1].__doc__) >= 1,
+                            "{:s} needs a docstring".format(func[0]))
+
+
+class TestJsonSnapshot(unittest.TestCase):
+    """Test the JSON snapshot with one object per line"""
+    def written(self, data):
+        """Returns the bytes write_json writes for data, and the positions
+        it returns"""
+        f = io.BytesIO()
+        positions = snapshot.write_json(
+            f, ((key, snapshot.encode_json(value))
+                for key, value in data.items()))
+        return f.getvalue(), positions
+
+    def test_positions(self):
+        """Test that json_positions finds what write_json wrote"""
+        text, positions = self.written(records)
+        self.assertEqual(json.loads(text), records)
+        self.assertEqual(snapshot.json_positions(io.BytesIO(text)),
+                         positions)
+        for key, position in positions.items():
+            self.assertEqual(json.loads(text[position]), records[key])
+
+    def test_empty(self):
+        """Test that empty snapshots have no objects"""
+        self.assertEqual(snapshot.json_positions(io.BytesIO(b"{}")), {})
+        text, positions = self.written({})
+        self.assertEqual(positions, {})
+        self.assertEqual(snapshot.json_positions(io.BytesIO(text)), {})
+
+    def test_other_layouts(self):
+        """Test that files not holding one object per line return None"""
+        for text in (json.dumps(records).encode(),
+                     json.dumps(records, indent=4).encode(), b"", b"\n"):
+            with self.subTest(text=text):
+                self.assertIsNone(
+                    snapshot.json_positions(io.BytesIO(text)))
+
+    def test_truncated(self):
+        """Test that a snapshot missing its last lines returns None"""
+        text, positions = self.written(records)
+        for end in (text.rindex(b"\n"), text.index(b"\n", 2)):
+            with self.subTest(end=end):
+                self.assertIsNone(
+                    snapshot.json_positions(io.BytesIO(text[:end])))
+
+    def test_trailing_lines(self):
+        """Test that lines after the closing one return None"""
+        text, positions = self.written(records)
+        self.assertIsNone(
+            snapshot.json_positions(io.BytesIO(text + b"\n\"k\": {}")))
+
+
+class TestBinarySnapshot(unittest.TestCase):
+    """Test the binary snapshot of marshal records"""
+    def setUp(self):
+        """Write records to a binary snapshot"""
+        fd, self.path = tempfile.mkstemp(suffix=".bin")
+        self.addCleanup(os.remove, self.path)
+        with os.fdopen(fd, "wb") as f:
+            self.positions = snapshot.write_binary(
+                f, ((key, marshal.dumps(value))
+                    for key, value in records.items()))
+
+    def test_positions(self):
+        """Test that binary_positions finds what write_binary wrote"""
+        with open(self.path, "rb") as f:
+            self.assertEqual(snapshot.binary_positions(f), self.positions)
+            f.seek(0)
+            data = f.read()
+        for key, position in self.positions.items():
+            self.assertEqual(marshal.loads(data[position]), records[key])
+
+    def test_read(self):
+        """Test that read_binary returns every to_dict() dictionary"""
+        with open(self.path, "rb") as f:
+            self.assertEqual(snapshot.read_binary(f), records)
+
+    def test_not_binary(self):
+        """Test that binary_positions refuses other files"""
+        for data in (json.dumps(records).encode(), b"", snapshot.MAGIC,
+                     snapshot.MAGIC[:-1] + b"\x01" + b"\0" * 12):
+            with self.subTest(data=data):
+                self.assertRaises(ValueError, snapshot.binary_positions,
+                                  io.BytesIO(data))
+
+    def test_other_marshal_version(self):
+        """Test that a snapshot of another marshal version is refused"""
+        with open(self.path, "r+b") as f:
+            head = f.read(len(snapshot.MAGIC) + snapshot.HEADER.size)
+            version, offset = snapshot.HEADER.unpack_from(
+                head, len(snapshot.MAGIC))
+            f.seek(len(snapshot.MAGIC))
+            f.write(snapshot.HEADER.pack(version + 1, offset))
+        with open(self.path, "rb") as f:
+            with self.assertRaisesRegex(ValueError, "marshal version"):
+                snapshot.binary_positions(f)
+            f.seek(0)
+            self.assertRaises(ValueError, snapshot.read_binary, f)
+
+
+if __name__ == '__main__':
+    unittest.main()